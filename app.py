@@ -1,31 +1,41 @@
-from flask import Flask, render_template, request, jsonify, send_file
+import time
+_import_start = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, url_for
 from flasgger import Swagger, swag_from
-from previsao_fechamento_acao import prepare_data_for_prediction, make_prediction, get_latest_model
-from inf_acao import get_stock_info, plot_recent_prices
+from previsao_fechamento_acao import compute_prediction, make_batch_prediction, render_prediction_chart, warm_up
+from inf_acao import get_stock_info, render_recent_prices_chart, recent_prices_series
+from tarefas_treinamento import (
+    JobConflictError,
+    submit_job,
+    get_job,
+    latest_job,
+    cancel_job,
+    dispatch,
+    TRAINING_PARAMS
+)
 import sys
 import os
-import mlflow
-import base64
-from io import BytesIO
-import matplotlib
-matplotlib.use('Agg')
 import threading
-import subprocess
+import json
 from datetime import datetime
-import shutil
 import psutil
-from prometheus_client import Counter, Histogram, Gauge, start_http_server
+from prometheus_client import Counter, Histogram, Gauge
 from monitoramento import (
     ModelMonitor, 
-    monitor_prediction, 
     get_resource_usage,
-    PREDICTION_COUNTER, 
-    PREDICTION_LATENCY,
-    MODEL_ACCURACY
+    start_monitoring_server,
+    PREDICTION_COUNTER
 )
+from perfil_inicializacao import record_import, mark_healthy, profile_startup
 import logging
 from functools import wraps
-import time
+
+# Backend sem interface gráfica; o matplotlib só é importado ao gerar o primeiro gráfico
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Dependências pesadas (mlflow, sklearn, yfinance, matplotlib) são importadas sob demanda
+record_import('app', time.perf_counter() - _import_start)
 
 # Configurar logging
 logging.basicConfig(
@@ -43,7 +53,7 @@ model_monitor = ModelMonitor()
 # Métricas adicionais
 REQUEST_LATENCY = Histogram('http_request_latency_seconds', 'HTTP request latency', ['endpoint'])
 ERROR_COUNTER = Counter('http_request_errors_total', 'Total HTTP request errors', ['endpoint'])
-ACTIVE_REQUESTS = Gauge('http_requests_active', 'Number of active HTTP requests')
+ACTIVE_REQUESTS = Gauge('http_requests_active', 'Number of active HTTP requests', multiprocess_mode='livesum')
 
 # Caminho da pasta que será zipada
 FOLDER_TO_ZIP = 'mlruns'
@@ -115,32 +125,62 @@ def monitor_endpoint(f):
             
     return decorated_function
 
-# Status do treinamento
-training_status = {
-    "is_running": False,
-    "start_time": None,
-    "end_time": None,
-    "run_id": None,
-    "error": None,
-    "metrics": None
+# Estado do aquecimento do worker (modelo carregado e primeira inferência executada)
+warm_up_status = {
+    "ready": threading.Event(),
+    "run_ids": None,
+    "duration": None,
+    "error": None
 }
 
+def run_warm_up():
+    """Aquecer o modelo deste processo e marcar o worker como pronto"""
+    start_time = time.time()
+    try:
+        warm_up_status["run_ids"] = warm_up()
+        logger.info(f"Aquecimento concluído em {time.time() - start_time:.2f}s")
+    except Exception as e:
+        # Sem modelo disponível o worker ainda atende os demais endpoints
+        warm_up_status["error"] = str(e)
+        logger.error(f"Erro no aquecimento do modelo: {str(e)}")
+    finally:
+        warm_up_status["duration"] = time.time() - start_time
+        warm_up_status["ready"].set()
+
+def start_warm_up():
+    """Iniciar o aquecimento em segundo plano (chamado após o fork de cada worker)"""
+    threading.Thread(target=run_warm_up, daemon=True).start()
+
 @app.route('/health')
 @monitor_endpoint
 def health_check():
     """Verificar saúde da aplicação"""
     try:
-        # Verificar conexão com MLflow
-        mlflow.get_tracking_uri()
-        
         # Verificar recursos do sistema
         resources = get_resource_usage()
         
+        warm_up_info = {
+            'run_ids': warm_up_status['run_ids'],
+            'duration': warm_up_status['duration'],
+            'error': warm_up_status['error']
+        }
+        
+        # Pronto apenas após o aquecimento do modelo neste worker
+        if not warm_up_status['ready'].is_set():
+            return jsonify({
+                'status': 'warming_up',
+                'timestamp': datetime.now().isoformat(),
+                'warm_up': warm_up_info
+            }), 503
+        
+        mark_healthy()
+        
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
             'resources': resources,
             'active_requests': ACTIVE_REQUESTS._value.get(),
+            'warm_up': warm_up_info
         })
     except Exception as e:
         logger.error(f"Erro no health check: {str(e)}")
@@ -193,24 +233,17 @@ def pagina_inicial():
 })
 def obter_informacoes_acao():
     try:
-        ticker = request.form.get('ticker', 'AMBA')
+        ticker = request.form.get('ticker', 'AMBA').upper()
         stock_info, dados_recentes = get_stock_info(ticker)
         
         if stock_info is None:
             raise ValueError('Não foi possível obter informações da ação')
         
-        plt = plot_recent_prices(dados_recentes, 
-                               f"Preços Recentes - {stock_info['Nome Empresa']} ({ticker})")
-        
-        img = BytesIO()
-        plt.savefig(img, format='png', bbox_inches='tight')
-        img.seek(0)
-        graph_url = base64.b64encode(img.getvalue()).decode()
-        plt.close()
-        
+        # O gráfico é servido como PNG em endpoint próprio (sem base64 no JSON)
         return jsonify({
             'stock_info': stock_info,
-            'graph': graph_url
+            'graph_url': url_for('grafico_precos_recentes', ticker=ticker),
+            'series_url': url_for('serie_precos_recentes', ticker=ticker)
         })
         
     except Exception as e:
@@ -219,23 +252,33 @@ def obter_informacoes_acao():
 
 @app.route('/fazer_previsao', methods=['POST'])
 @monitor_endpoint
-@monitor_prediction
 @swag_from({
     'tags': ['ações'],
-    'summary': 'Realiza previsão de preço'
+    'summary': 'Realiza previsão de preço',
+    'parameters': [
+        {
+            'name': 'ticker',
+            'in': 'formData',
+            'type': 'string',
+            'required': False,
+            'default': 'AMBA'
+        }
+    ]
 })
 def fazer_previsao_acao():
+    inicio = time.perf_counter()
     try:
-        prediction, ultimo_preco, variacao = make_prediction()
-        
-        if prediction is None:
-            raise ValueError('Erro ao fazer previsão')
+        ticker = request.form.get('ticker', 'AMBA').upper()
+        resultado = compute_prediction(ticker)
+        prediction = resultado['prediction']
+        ultimo_preco = resultado['ultimo_preco']
+        variacao = resultado['variacao']
         
         # Registrar previsão no monitor
         prediction_data = {
             'prediction': prediction,
             'timestamp': datetime.now(),
-            'latency': time.time() - request.start_time,
+            'latency': time.perf_counter() - inicio,
             'memory_usage': psutil.Process().memory_info().rss,
             'cpu_usage': psutil.cpu_percent()
         }
@@ -244,13 +287,162 @@ def fazer_previsao_acao():
         return jsonify({
             'prediction': f"${prediction:.2f}",
             'ultimo_preco': f"${ultimo_preco:.2f}",
-            'variacao': f"{variacao:.2f}%"
+            'variacao': f"{variacao:.2f}%",
+            'horizonte': [f"${p:.2f}" for p in resultado['horizonte']]
         })
         
     except Exception as e:
         logger.error(f"Erro ao fazer previsão: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/previsao/grafico')
+@monitor_endpoint
+@swag_from({
+    'tags': ['ações'],
+    'summary': 'Gráfico PNG da previsão de preço',
+    'parameters': [
+        {
+            'name': 'ticker',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'default': 'AMBA'
+        }
+    ]
+})
+def grafico_previsao():
+    try:
+        ticker = request.args.get('ticker', 'AMBA').upper()
+        etag, png = render_prediction_chart(ticker)
+        return png_response(etag, png)
+        
+    except Exception as e:
+        logger.error(f"Erro ao gerar gráfico da previsão: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+# Validade no navegador dos gráficos (o ETag permite revalidar sem baixar de novo)
+CHART_MAX_AGE = int(os.environ.get('CHART_MAX_AGE', 300))
+
+def png_response(etag, png):
+    """Resposta PNG com ETag e Cache-Control; 304 se o cliente já tem a versão atual"""
+    response = Response(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CHART_MAX_AGE
+    return response.make_conditional(request)
+
+def _recent_prices_for(ticker):
+    stock_info, dados_recentes = get_stock_info(ticker)
+    if stock_info is None:
+        raise ValueError('Não foi possível obter informações da ação')
+    return stock_info, dados_recentes
+
+@app.route('/graficos/precos_recentes.png')
+@monitor_endpoint
+@swag_from({
+    'tags': ['ações'],
+    'summary': 'Gráfico PNG dos preços recentes de uma ação',
+    'parameters': [
+        {'name': 'ticker', 'in': 'query', 'type': 'string', 'required': False, 'default': 'AMBA'}
+    ]
+})
+def grafico_precos_recentes():
+    try:
+        ticker = request.args.get('ticker', 'AMBA').upper()
+        stock_info, dados_recentes = _recent_prices_for(ticker)
+        etag, png = render_recent_prices_chart(stock_info, dados_recentes, ticker)
+        return png_response(etag, png)
+        
+    except Exception as e:
+        logger.error(f"Erro ao gerar gráfico de preços recentes: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/graficos/precos_recentes.json')
+@monitor_endpoint
+@swag_from({
+    'tags': ['ações'],
+    'summary': 'Série de preços recentes de uma ação (para o front end desenhar o gráfico)',
+    'parameters': [
+        {'name': 'ticker', 'in': 'query', 'type': 'string', 'required': False, 'default': 'AMBA'}
+    ]
+})
+def serie_precos_recentes():
+    try:
+        ticker = request.args.get('ticker', 'AMBA').upper()
+        stock_info, dados_recentes = _recent_prices_for(ticker)
+        return jsonify(recent_prices_series(stock_info, dados_recentes, ticker))
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter série de preços recentes: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+# Limite de tickers aceitos em uma previsão em lote
+MAX_BATCH_TICKERS = int(os.environ.get('MAX_BATCH_TICKERS', 500))
+
+@app.route('/previsoes/lote', methods=['POST'])
+@monitor_endpoint
+@swag_from({
+    'tags': ['ações'],
+    'summary': 'Realiza previsão de preço para uma lista de tickers',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'tickers': {
+                        'type': 'array',
+                        'items': {'type': 'string'},
+                        'example': ['AMBA', 'NVDA']
+                    }
+                }
+            }
+        }
+    ]
+})
+def fazer_previsao_lote():
+    try:
+        payload = request.get_json(silent=True) or {}
+        tickers = payload.get('tickers') or request.form.getlist('tickers')
+        if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            raise ValueError("'tickers' deve ser uma lista de strings")
+        
+        # Normalizar e remover duplicados mantendo a ordem
+        tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        
+        if not tickers:
+            raise ValueError('Informe ao menos um ticker')
+        if len(tickers) > MAX_BATCH_TICKERS:
+            raise ValueError(f'Máximo de {MAX_BATCH_TICKERS} tickers por requisição')
+        
+        resultados = make_batch_prediction(tickers)
+        
+        resposta = []
+        for resultado in resultados:
+            if 'error' in resultado:
+                resposta.append(resultado)
+                continue
+            resposta.append({
+                'ticker': resultado['ticker'],
+                'run_id': resultado['run_id'],
+                'prediction': f"${resultado['prediction']:.2f}",
+                'ultimo_preco': f"${resultado['ultimo_preco']:.2f}",
+                'variacao': f"{resultado['variacao']:.2f}%",
+                'horizonte': [f"${p:.2f}" for p in resultado['horizonte']]
+            })
+        
+        PREDICTION_COUNTER.inc(len(resposta) - sum('error' in r for r in resposta))
+        
+        return jsonify({
+            'resultados': resposta
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao fazer previsão em lote: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/treinamentomodelo')
 @monitor_endpoint
 def painel_treinamento():
@@ -261,40 +453,180 @@ def painel_treinamento():
 @monitor_endpoint
 @swag_from({
     'tags': ['treinamento'],
-    'summary': 'Inicia treinamento do modelo'
+    'summary': 'Inicia treinamento do modelo',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'ticker': {'type': 'string', 'example': 'AMBA'},
+                    'start_date': {'type': 'string', 'example': '2019-01-01'},
+                    'end_date': {'type': 'string'},
+                    'window': {'type': 'integer', 'example': 60},
+                    'horizon': {'type': 'integer', 'example': 1},
+                    'batch_size': {'type': 'integer', 'example': 32},
+                    'epochs': {'type': 'integer', 'example': 20},
+                    'units': {'type': 'integer', 'example': 50},
+                    'dense_units': {'type': 'integer', 'example': 25},
+                    'patience': {'type': 'integer', 'example': 3}
+                }
+            }
+        }
+    ]
 })
 def treinar_modelo():
-    global training_status
-    
-    if training_status["is_running"]:
-        return jsonify({
-            "status": "erro",
-            "message": "Já existe um treinamento em andamento"
-        }), 400
-    
     try:
-        thread = threading.Thread(target=execute_model_training)
-        thread.start()
+        payload = request.get_json(silent=True) or {}
+        desconhecidos = set(payload) - set(TRAINING_PARAMS)
+        if desconhecidos:
+            return jsonify({
+                "status": "erro",
+                "message": f"Parâmetros desconhecidos: {', '.join(sorted(desconhecidos))}"
+            }), 400
+        params = {}
+        for name, value in payload.items():
+            if name in ('ticker', 'start_date', 'end_date'):
+                params[name] = str(value).strip().upper() if name == 'ticker' else str(value)
+            elif not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                return jsonify({
+                    "status": "erro",
+                    "message": f"'{name}' deve ser um inteiro positivo"
+                }), 400
+            else:
+                params[name] = value
+        
+        job = submit_job(params)
         
         return jsonify({
             "status": "iniciado",
             "message": "Treinamento iniciado com sucesso",
-            "start_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            "job_id": job['id'],
+            "start_time": job['start_time'] or job['created_at']
         })
+    except JobConflictError as e:
+        return jsonify({
+            "status": "erro",
+            "message": str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Erro ao iniciar treinamento: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-# Iniciar servidor de métricas do Prometheus
+def _format_job_status(job):
+    """Formatar a tarefa no formato esperado pelo painel de treinamento"""
+    if job is None:
+        return {"is_running": False, "start_time": None, "end_time": None,
+                "run_id": None, "error": None, "metrics": None}
+    
+    metrics = job['metrics']
+    if metrics:
+        metrics = {
+            'train': f"MAE: ${metrics['train_mae']:.2f}, RMSE: ${metrics['train_rmse']:.2f}",
+            'test': f"MAE: ${metrics['test_mae']:.2f}, RMSE: ${metrics['test_rmse']:.2f}"
+        }
+    
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "is_running": job['status'] in ('queued', 'running'),
+        "start_time": job['start_time'],
+        "end_time": job['end_time'],
+        "run_id": job['run_id'],
+        "error": job['error'] or ('Treinamento cancelado' if job['status'] == 'cancelled' else None),
+        "metrics": metrics,
+        "progress": {
+            "epoch": job['epoch'],
+            "total_epochs": job['total_epochs'],
+            "loss": job['loss']
+        }
+    }
+
+@app.route('/treinamentomodelo/status')
+@monitor_endpoint
+@swag_from({
+    'tags': ['treinamento'],
+    'summary': 'Status do treinamento mais recente'
+})
+def status_treinamento():
+    try:
+        dispatch()
+        return jsonify(_format_job_status(latest_job()))
+    except Exception as e:
+        logger.error(f"Erro ao obter status do treinamento: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/treinamentomodelo/tarefas/<job_id>')
+@monitor_endpoint
+@swag_from({
+    'tags': ['treinamento'],
+    'summary': 'Status e progresso de uma tarefa de treinamento',
+    'parameters': [
+        {'name': 'job_id', 'in': 'path', 'type': 'string', 'required': True}
+    ]
+})
+def status_tarefa(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    return jsonify(_format_job_status(job))
+
+@app.route('/treinamentomodelo/tarefas/<job_id>/cancelar', methods=['POST'])
+@monitor_endpoint
+@swag_from({
+    'tags': ['treinamento'],
+    'summary': 'Cancela uma tarefa de treinamento',
+    'parameters': [
+        {'name': 'job_id', 'in': 'path', 'type': 'string', 'required': True}
+    ]
+})
+def cancelar_tarefa(job_id):
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    return jsonify(_format_job_status(job))
+
+@app.route('/treinamentomodelo/tarefas/<job_id>/progresso')
+def progresso_tarefa(job_id):
+    """Enviar o progresso da tarefa como Server-Sent Events até ela terminar"""
+    def eventos():
+        ultimo = None
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                yield 'event: erro\ndata: {"error": "Tarefa não encontrada"}\n\n'
+                return
+            status = _format_job_status(job)
+            if status != ultimo:
+                yield f"data: {json.dumps(status)}\n\n"
+                ultimo = status
+            if not status['is_running']:
+                return
+            time.sleep(1)
+    
+    return Response(eventos(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+# Iniciar servidor de métricas do Prometheus (no gunicorn, iniciado pelo gunicorn.conf.py)
 def start_metrics_server():
-    start_http_server(8000)
+    start_monitoring_server(8000)
     logger.info("Servidor de métricas iniciado na porta 8000")
 
 if __name__ == '__main__':
+    # Modo de perfil: tempo de import por módulo e até o primeiro /health saudável
+    if '--profile-startup' in sys.argv:
+        profile_startup('app')
+        sys.exit(0)
+    
     # Iniciar servidor de métricas em thread separada
     metrics_thread = threading.Thread(target=start_metrics_server, daemon=True)
     metrics_thread.start()
     
+    # Aquecer o modelo antes do primeiro acesso
+    start_warm_up()
+    
     # Certificar-se de que a pasta que você quer zipar existe
     if not os.path.exists(FOLDER_TO_ZIP):
         os.makedirs(FOLDER_TO_ZIP)
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from armazenamento_precos import price_store
+
+logger = logging.getLogger(__name__)
+
+# Diretório do armazenamento de janelas normalizadas, usadas pela API no lugar do preparo por requisição
+WINDOW_STORE_DIR = os.environ.get('WINDOW_STORE_DIR', os.path.join(os.getcwd(), 'data', 'janelas'))
+WINDOW_STORE_ENABLED = os.environ.get('WINDOW_STORE_ENABLED', '1') == '1'
+
+# Tickers processados pela tarefa pós-fechamento (lista separada por vírgulas)
+WINDOW_STORE_TICKERS = [t for t in os.environ.get('WINDOW_STORE_TICKERS', 'AMBA').split(',') if t.strip()]
+
+def _previous_session(today=None):
+    """Último pregão (dia útil) anterior a hoje"""
+    today = np.datetime64(today or datetime.now().date(), 'D')
+    return np.busday_offset(today, -1, roll='forward')
+
+class WindowStore:
+    """Janelas de entrada normalizadas por ticker, pré-calculadas após o fechamento
+
+    Cada versão ocupa um diretório com `janelas.npy` (n, window, 1) em float32 e
+    `escala.npy` (n, 2) com o mínimo e a amplitude usados na normalização (para
+    desfazê-la), lidos via memória mapeada. O `indice.json`, trocado atomicamente,
+    aponta para a versão atual e guarda, por ticker, a linha, o pregão a que a
+    janela corresponde e o último fechamento.
+    """
+
+    def __init__(self, base_dir=WINDOW_STORE_DIR):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._index_mtime = None
+
+    @property
+    def index_path(self):
+        return os.path.join(self.base_dir, 'indice.json')
+
+    def build(self, tickers, window=60, as_of=None, prices=price_store):
+        """Calcular as janelas dos tickers e publicar uma nova versão; retorna o índice"""
+        tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        fim = pd.Timestamp(as_of) + timedelta(days=1) if as_of else None
+        inicio = (pd.Timestamp(as_of) if as_of else pd.Timestamp.now()) - timedelta(days=window * 2 + 30)
+
+        # Baixar as barras que faltam de todos os tickers em paralelo antes de montar as janelas
+        prices.sync_many(tickers, inicio)
+
+        janelas, escalas, entradas = [], [], {}
+        for ticker in tickers:
+            try:
+                closes = prices.get_history(ticker, inicio, fim)['Close']
+                if len(closes) < window:
+                    raise ValueError(f"Dados insuficientes. Necessário {window} dias.")
+                closes = closes.iloc[-window:]
+                lo, hi = float(closes.min()), float(closes.max())
+                # Mesmo tratamento do MinMaxScaler para amplitude zero
+                amplitude = hi - lo if hi > lo else 1.0
+                janelas.append(((closes.to_numpy() - lo) / amplitude).reshape(window, 1))
+                escalas.append((lo, amplitude))
+                entradas[ticker] = {'row': len(entradas),
+                                    'date': closes.index[-1].strftime('%Y-%m-%d'),
+                                    'last_close': float(closes.iloc[-1])}
+            except Exception as e:
+                print(f"Erro ao preparar janela de {ticker}: {e}")
+
+        if not entradas:
+            raise ValueError("Nenhuma janela calculada")
+
+        # Gravar a nova versão em seu próprio diretório antes de publicá-la no índice
+        versao = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        directory = os.path.join(self.base_dir, versao)
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'janelas.npy'), np.asarray(janelas, dtype='float32'))
+        np.save(os.path.join(directory, 'escala.npy'), np.asarray(escalas, dtype='float64'))
+
+        indice = {
+            'version': max(e['date'] for e in entradas.values()),
+            'directory': versao,
+            'window': window,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'tickers': entradas
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(indice, f)
+        os.replace(tmp_path, self.index_path)
+
+        # Manter a versão anterior (ainda pode estar mapeada por outro processo) e remover as demais
+        versoes = sorted(d for d in os.listdir(self.base_dir)
+                         if os.path.isdir(os.path.join(self.base_dir, d)))
+        for antiga in versoes[:-2]:
+            shutil.rmtree(os.path.join(self.base_dir, antiga), ignore_errors=True)
+        return indice
+
+    def _load(self):
+        """Recarregar índice e arrays mapeados quando uma nova versão for publicada"""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime == self._index_mtime:
+            return self._loaded
+
+        with self._lock:
+            if mtime != self._index_mtime:
+                try:
+                    with open(self.index_path) as f:
+                        indice = json.load(f)
+                    directory = os.path.join(self.base_dir, indice['directory'])
+                    self._loaded = (indice,
+                                    np.load(os.path.join(directory, 'janelas.npy'), mmap_mode='r'),
+                                    np.load(os.path.join(directory, 'escala.npy'), mmap_mode='r'))
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Armazenamento de janelas indisponível: {e}")
+                    self._loaded = None
+                self._index_mtime = mtime
+            return self._loaded
+
+    def get(self, ticker, window=60):
+        """Janela atual do ticker como (1, window, 1), ou None se ausente ou desatualizada"""
+        loaded = self._load()
+        if loaded is None:
+            return None
+        indice, janelas, escala = loaded
+        entrada = indice['tickers'].get(ticker.upper())
+        if entrada is None or indice['window'] != window:
+            return None
+
+        # Uma janela de pregões anteriores ao último não representa mais o mercado
+        if np.datetime64(entrada['date'], 'D') < _previous_session():
+            return None
+
+        row = entrada['row']
+        return {
+            'X': janelas[row:row + 1],
+            'data_min': float(escala[row, 0]),
+            'data_range': float(escala[row, 1]),
+            'date': pd.Timestamp(entrada['date']),
+            'last_close': entrada['last_close'],
+            'version': indice['version']
+        }
+
+# Instância por processo (o índice é relido apenas quando muda)
+window_store = WindowStore()
+
+if __name__ == '__main__':
+    # Uso (após o fechamento do pregão): python armazenamento_janelas.py [TICKER ...]
+    tickers = sys.argv[1:] or WINDOW_STORE_TICKERS
+    indice = window_store.build(tickers)
+    print(f"Versão {indice['version']}: {len(indice['tickers'])} de {len(tickers)} tickers "
+          f"gravados em {os.path.join(window_store.base_dir, indice['directory'])}")
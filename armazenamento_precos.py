@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Colunas OHLCV armazenadas (nesta ordem) para cada ticker
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Diretório do armazenamento e intervalo mínimo (segundos) entre consultas à fonte
+PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR', os.path.join(os.getcwd(), 'data', 'precos'))
+PRICE_REFRESH_INTERVAL = float(os.environ.get('PRICE_REFRESH_INTERVAL', 900))
+
+# Fonte padrão: 'http' (cliente compartilhado com limite de taxa e novas tentativas) ou 'yfinance'
+PRICE_PROVIDER = os.environ.get('PRICE_PROVIDER', 'http')
+
+# Formato aceito para tickers (ex.: AMBA, BRK.B, ^GSPC, ES=F). O ticker vira nome de
+# diretório: começar por letra, dígito ou ^ impede '.' e '..'
+TICKER_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.\-^=]{0,14}$')
+
+# Tickers sincronizados em paralelo por sync_many (o cliente HTTP aplica seus próprios limites)
+PRICE_SYNC_WORKERS = int(os.environ.get('PRICE_SYNC_WORKERS', 8))
+
+class YahooProvider:
+    """Fonte de dados via biblioteca yfinance (PRICE_PROVIDER=yfinance)"""
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+        return yf.Ticker(ticker).history(start=str(start), end=str(end), auto_adjust=False)
+
+class LocalFileProvider:
+    """Fonte de dados a partir de arquivos CSV locais (<diretorio>/<ticker>.csv)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, ticker, start, end):
+        dados = pd.read_csv(os.path.join(self.directory, f"{ticker}.csv"),
+                            index_col=0, parse_dates=True)
+        datas = _to_days(dados.index)
+        return dados[(datas >= np.datetime64(start, 'D')) & (datas < np.datetime64(end, 'D'))]
+
+def validate_ticker(ticker):
+    """Retornar o ticker em maiúsculas; ValueError se não seguir TICKER_PATTERN"""
+    normalizado = ticker.strip().upper() if isinstance(ticker, str) else ''
+    if not TICKER_PATTERN.match(normalizado):
+        raise ValueError(f"Ticker inválido: {ticker!r}")
+    return normalizado
+
+def _default_provider():
+    """Fonte configurada em PRICE_PROVIDER"""
+    if PRICE_PROVIDER == 'yfinance':
+        return YahooProvider()
+    from cliente_mercado import MarketDataProvider
+    return MarketDataProvider()
+
+def _to_days(index):
+    """Converter um DatetimeIndex (com ou sem fuso) para datetime64[D]"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]')
+
+def _normalize(dados):
+    """Extrair (datas, valores OHLCV) ordenados e sem duplicatas de um DataFrame"""
+    if dados is None or len(dados) == 0:
+        return np.empty(0, dtype='datetime64[D]'), np.empty((0, len(COLUMNS)))
+
+    if isinstance(dados.columns, pd.MultiIndex):
+        dados = dados.copy()
+        dados.columns = dados.columns.get_level_values(0)
+
+    dados = dados.dropna(subset=['Close'])
+    datas = _to_days(dados.index)
+    valores = dados[COLUMNS].to_numpy(dtype='float64')
+
+    datas, posicoes = np.unique(datas, return_index=True)
+    return datas, valores[posicoes]
+
+class PriceStore:
+    """Armazenamento local incremental de barras diárias OHLCV por ticker
+
+    Cada ticker ocupa um diretório com dois arquivos binários só de anexação
+    (datas e valores), lidos via memória mapeada, e um meta.json com a data
+    inicial coberta, a última consulta à fonte e a barra do dia corrente
+    (ainda não fechada, por isso não anexada).
+    """
+
+    def __init__(self, base_dir=PRICE_STORE_DIR, provider=None,
+                 refresh_interval=PRICE_REFRESH_INTERVAL):
+        self.base_dir = base_dir
+        self._provider = provider
+        self.refresh_interval = refresh_interval
+        # Uma trava por ticker, criada sob uma trava curta: tickers diferentes sincronizam em paralelo
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    @property
+    def provider(self):
+        """Fonte de dados, criada no primeiro uso (não pesa na inicialização da API)"""
+        if self._provider is None:
+            self._provider = _default_provider()
+        return self._provider
+
+    @provider.setter
+    def provider(self, provider):
+        self._provider = provider
+
+    def _paths(self, ticker):
+        directory = os.path.join(self.base_dir, validate_ticker(ticker))
+        return (directory,
+                os.path.join(directory, 'datas.bin'),
+                os.path.join(directory, 'valores.bin'),
+                os.path.join(directory, 'meta.json'))
+
+    def _ticker_lock(self, ticker):
+        """Trava por ticker entre threads, criada sob uma trava curta"""
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    @contextmanager
+    def _locked(self, ticker):
+        """Trava por ticker entre processos (workers do gunicorn); cria o diretório do ticker"""
+        directory = self._paths(ticker)[0]
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, ticker):
+        meta_path = self._paths(ticker)[3]
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, ticker, meta):
+        meta_path = self._paths(ticker)[3]
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _read(self, ticker):
+        """Ler as barras armazenadas como arrays mapeados em memória (sem cópia)"""
+        _, datas_path, valores_path, _ = self._paths(ticker)
+        if not os.path.exists(datas_path) or os.path.getsize(datas_path) == 0:
+            return np.empty(0, dtype='datetime64[D]'), np.empty((0, len(COLUMNS)))
+        datas = np.memmap(datas_path, dtype='datetime64[D]', mode='r')
+        valores = np.memmap(valores_path, dtype='float64', mode='r').reshape(-1, len(COLUMNS))
+        return datas, valores[:len(datas)]
+
+    def _write(self, ticker, datas, valores, append):
+        """Anexar (ou regravar) barras nos arquivos binários"""
+        _, datas_path, valores_path, _ = self._paths(ticker)
+        if append:
+            with open(valores_path, 'ab') as f:
+                f.write(np.ascontiguousarray(valores, dtype='float64').tobytes())
+            with open(datas_path, 'ab') as f:
+                f.write(np.ascontiguousarray(datas, dtype='datetime64[D]').tobytes())
+            return
+
+        for path, array in ((valores_path, valores.astype('float64')),
+                            (datas_path, datas.astype('datetime64[D]'))):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(np.ascontiguousarray(array).tobytes())
+            os.replace(tmp_path, path)
+
+    def _store(self, ticker, meta, datas, valores, append, hoje):
+        """Persistir barras fechadas e guardar a barra do dia corrente no meta"""
+        fechadas = datas < hoje
+        if fechadas.any():
+            self._write(ticker, datas[fechadas], valores[fechadas], append)
+        elif not append:
+            self._write(ticker, datas[:0], valores[:0], append)
+
+        meta['live'] = None
+        if (~fechadas).any():
+            meta['live'] = {'date': str(datas[~fechadas][-1]),
+                            'values': valores[~fechadas][-1].tolist()}
+        meta['checked_at'] = time.time()
+        self._write_meta(ticker, meta)
+
+    def sync(self, ticker, start):
+        """Garantir que o intervalo [start, hoje] esteja armazenado, baixando só o que falta"""
+        ticker = validate_ticker(ticker)
+        start = np.datetime64(pd.Timestamp(start).date(), 'D')
+        hoje = np.datetime64(pd.Timestamp.now().date(), 'D')
+
+        meta = self._read_meta(ticker)
+        if (meta is not None and np.datetime64(meta['start'], 'D') <= start and
+                time.time() - meta['checked_at'] < self.refresh_interval):
+            return
+
+        with self._ticker_lock(ticker):
+            meta = self._read_meta(ticker)
+
+            # Ticker novo ou intervalo anterior ao coberto: baixar tudo a partir de start antes
+            # de criar qualquer arquivo, para que tickers inexistentes não deixem diretórios
+            if meta is None or start < np.datetime64(meta['start'], 'D'):
+                datas, valores = _normalize(self.provider.fetch(ticker, start, hoje + 1))
+                if len(datas) == 0:
+                    raise ValueError(f"Nenhum dado encontrado para {ticker}")
+                with self._locked(ticker):
+                    self._store(ticker, {'start': str(start)}, datas, valores, False, hoje)
+                return
+
+            with self._locked(ticker):
+                # Outro processo pode ter atualizado enquanto esperávamos a trava
+                meta = self._read_meta(ticker)
+                if time.time() - meta['checked_at'] < self.refresh_interval:
+                    return
+
+                # Baixar apenas as barras posteriores à última armazenada
+                armazenadas = self._read(ticker)[0]
+                inicio = armazenadas[-1] + 1 if len(armazenadas) else start
+                try:
+                    datas, valores = _normalize(self.provider.fetch(ticker, inicio, hoje + 1))
+                except Exception as e:
+                    logger.warning(f"Falha ao atualizar {ticker}, usando dados armazenados: {e}")
+                    return
+                novas = datas >= inicio
+                self._store(ticker, meta, datas[novas], valores[novas], True, hoje)
+
+    def sync_many(self, tickers, start, max_workers=PRICE_SYNC_WORKERS):
+        """Sincronizar vários tickers em paralelo; retorna {ticker: erro ou None}"""
+        def sync(ticker):
+            try:
+                self.sync(ticker, start)
+            except Exception as e:
+                logger.warning(f"Falha ao sincronizar {ticker}: {e}")
+                return str(e)
+
+        tickers = list(tickers)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as executor:
+            return dict(zip(tickers, executor.map(sync, tickers)))
+
+    def get_history(self, ticker, start, end=None):
+        """Retornar as barras OHLCV de [start, end) como DataFrame indexado por data"""
+        self.sync(ticker, start)
+
+        inicio = np.datetime64(pd.Timestamp(start).date(), 'D')
+        fim = (np.datetime64(pd.Timestamp(end).date(), 'D') if end is not None
+               else np.datetime64('9999-12-31', 'D'))
+
+        datas, valores = self._read(ticker)
+        lo, hi = np.searchsorted(datas, [inicio, fim])
+        datas, valores = datas[lo:hi], valores[lo:hi]
+
+        # Incluir a barra do dia corrente, se pertencer ao intervalo
+        live = (self._read_meta(ticker) or {}).get('live')
+        if live is not None:
+            data_live = np.datetime64(live['date'], 'D')
+            if inicio <= data_live < fim and (len(datas) == 0 or data_live > datas[-1]):
+                datas = np.append(datas, data_live)
+                valores = np.vstack([valores, live['values']])
+
+        return pd.DataFrame(np.asarray(valores), columns=COLUMNS,
+                            index=pd.DatetimeIndex(np.asarray(datas).astype('datetime64[ns]'), name='Date'))
+
+# Instância compartilhada pelos módulos de previsão, informação e treinamento
+price_store = PriceStore()
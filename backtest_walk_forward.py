@@ -0,0 +1,186 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from contextlib import contextmanager
+from datetime import datetime
+from armazenamento_precos import price_store
+from janelas import create_windows
+from criacao_modelo import build_model, make_dataset, TRAINING_BATCH_SIZE, WINDOW, LSTM_UNITS, DENSE_UNITS
+
+# Tamanho dos lotes de inferência (todas as janelas de um fold em poucas chamadas)
+PREDICT_BATCH_SIZE = 4096
+
+@contextmanager
+def _stage(timings, name):
+    """Acumular o tempo de uma etapa em `timings`"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - inicio
+
+def _fold_metrics(previsto, real, ultimo):
+    """MAE, RMSE e acerto de direção (subida/queda em relação ao último fechamento)"""
+    erro = previsto - real
+    return {
+        'mae': float(np.mean(np.abs(erro))),
+        'rmse': float(np.sqrt(np.mean(erro ** 2))),
+        'direcao': float(np.mean(np.sign(previsto - ultimo) == np.sign(real - ultimo)))
+    }
+
+def walk_forward_backtest(ticker='AMBA', start_date='2019-01-01', end_date=None, window=WINDOW,
+                          min_train=500, retrain_every=63, epochs=10, refit_epochs=3,
+                          warm_start=True, batch_size=TRAINING_BATCH_SIZE, units=LSTM_UNITS,
+                          dense_units=DENSE_UNITS, rolling=21, dados=None):
+    """Backtest walk-forward: re-treinar a cada `retrain_every` pregões e prever o bloco seguinte
+
+    As janelas de todo o histórico são criadas uma única vez (views de `create_windows`);
+    cada fold treina com as janelas anteriores ao bloco e pontua o bloco inteiro em lote.
+    Com `warm_start`, os folds seguintes continuam do modelo anterior por `refit_epochs` épocas.
+    """
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+    timings = {}
+
+    with _stage(timings, 'dados'):
+        if dados is None:
+            dados = price_store.get_history(ticker, start_date, end_date)
+        closes = dados['Close'].to_numpy(dtype='float64')
+
+    with _stage(timings, 'janelas'):
+        # X: (n, window, 1) e y: (n, 1), sem cópia; janela i prevê o fechamento de index[window + i]
+        X_raw, y_raw = create_windows(closes, window=window)
+        n = len(X_raw)
+        if n <= min_train:
+            raise ValueError(f"Dados insuficientes: {n} janelas para min_train={min_train}")
+
+    folds = []
+    partes = []
+    model = None
+    for fold, t0 in enumerate(range(min_train, n, retrain_every)):
+        t1 = min(t0 + retrain_every, n)
+        resultado = {'fold': fold, 'inicio': dados.index[window + t0], 'fim': dados.index[window + t1 - 1],
+                     'treino': t0, 'teste': t1 - t0}
+
+        # Normalização ajustada apenas com os preços conhecidos até o início do bloco
+        inicio = time.perf_counter()
+        with _stage(timings, 'normalizacao'):
+            lo = closes[:t0 + window].min()
+            escala = 1.0 / (closes[:t0 + window].max() - lo)
+            X_train = (X_raw[:t0] - lo) * escala
+            y_train = (y_raw[:t0] - lo) * escala
+            X_test = ((X_raw[t0:t1] - lo) * escala).astype('float32')
+        resultado['normalizacao_seconds'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with _stage(timings, 'treino'):
+            if model is None or not warm_start:
+                model = build_model(window, units, dense_units, horizon=1)
+                fold_epochs = epochs
+            else:
+                fold_epochs = refit_epochs
+            model.fit(make_dataset(X_train, y_train, batch_size, shuffle=True),
+                      epochs=fold_epochs, verbose=0)
+        resultado['treino_seconds'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        with _stage(timings, 'previsao'):
+            previsto = model.predict(X_test, batch_size=PREDICT_BATCH_SIZE, verbose=0)[:, 0] / escala + lo
+        resultado['previsao_seconds'] = time.perf_counter() - inicio
+
+        with _stage(timings, 'metricas'):
+            real = y_raw[t0:t1, 0]
+            ultimo = X_raw[t0:t1, -1, 0]
+            resultado.update(_fold_metrics(previsto, real, ultimo))
+            partes.append(pd.DataFrame({'fold': fold, 'ultimo': ultimo, 'real': real,
+                                        'previsto': previsto},
+                                       index=dados.index[window + t0:window + t1]))
+        folds.append(resultado)
+        print(f"Fold {fold}: {resultado['inicio']:%Y-%m-%d} a {resultado['fim']:%Y-%m-%d} | "
+              f"MAE ${resultado['mae']:.2f} | RMSE ${resultado['rmse']:.2f} | "
+              f"Direção {resultado['direcao']:.1%} | treino {resultado['treino_seconds']:.1f}s")
+
+    with _stage(timings, 'metricas'):
+        previsoes = pd.concat(partes)
+        erro = previsoes['previsto'] - previsoes['real']
+        previsoes[f'mae_{rolling}d'] = erro.abs().rolling(rolling).mean()
+        previsoes[f'rmse_{rolling}d'] = np.sqrt((erro ** 2).rolling(rolling).mean())
+        acerto = (np.sign(previsoes['previsto'] - previsoes['ultimo']) ==
+                  np.sign(previsoes['real'] - previsoes['ultimo']))
+        previsoes[f'direcao_{rolling}d'] = acerto.astype(float).rolling(rolling).mean()
+        geral = _fold_metrics(previsoes['previsto'].to_numpy(), previsoes['real'].to_numpy(),
+                              previsoes['ultimo'].to_numpy())
+
+    return {'ticker': ticker, 'folds': folds, 'geral': geral,
+            'previsoes': previsoes, 'timings': timings}
+
+def plot_backtest(resultado, fig):
+    """Desenhar previsto vs real, com o início de cada fold e o MAE móvel"""
+    previsoes = resultado['previsoes']
+    ax1, ax2 = fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    ax1.plot(previsoes.index, previsoes['real'], 'b', label='Real', linewidth=1.5)
+    ax1.plot(previsoes.index, previsoes['previsto'], 'r--', label='Previsto', linewidth=1.5)
+    for fold in resultado['folds']:
+        ax1.axvline(fold['inicio'], color='gray', linestyle=':', alpha=0.6)
+    ax1.set_title(f'Backtest Walk-Forward - {resultado["ticker"]}', fontsize=16)
+    ax1.set_ylabel('Preço ($)', fontsize=12)
+    ax1.legend()
+    ax1.grid(True)
+
+    coluna = next(c for c in previsoes.columns if c.startswith('mae_'))
+    ax2.plot(previsoes.index, previsoes[coluna], 'purple', label=coluna.replace('_', ' ').upper())
+    ax2.set_xlabel('Data', fontsize=12)
+    ax2.set_ylabel('MAE ($)', fontsize=12)
+    ax2.legend()
+    ax2.grid(True)
+
+    fig.tight_layout()
+    return fig
+
+def print_report(resultado):
+    """Imprimir métricas por fold, gerais e tempo de cada etapa"""
+    print("\nResultados por Fold:")
+    print("\nFold | Início     | Fim        | Treino | Teste | MAE      | RMSE     | Direção")
+    print("-" * 80)
+    for f in resultado['folds']:
+        print(f"{f['fold']:4d} | {f['inicio']:%Y-%m-%d} | {f['fim']:%Y-%m-%d} | {f['treino']:6d} | "
+              f"{f['teste']:5d} | ${f['mae']:7.2f} | ${f['rmse']:7.2f} | {f['direcao']:7.1%}")
+
+    geral = resultado['geral']
+    print(f"\nGeral - MAE: ${geral['mae']:.2f}, RMSE: ${geral['rmse']:.2f}, "
+          f"Direção: {geral['direcao']:.1%}")
+
+    print("\nTempo por etapa:")
+    total = sum(resultado['timings'].values())
+    for etapa, segundos in resultado['timings'].items():
+        print(f"  {etapa:13} {segundos:8.2f}s ({segundos / total:.0%})")
+    print(f"  {'total':13} {total:8.2f}s")
+
+def parse_args(argv=None):
+    """Argumentos da linha de comando do backtest"""
+    parser = argparse.ArgumentParser(description='Backtest walk-forward do modelo LSTM')
+    parser.add_argument('--ticker', default='AMBA')
+    parser.add_argument('--inicio', dest='start_date', default='2019-01-01')
+    parser.add_argument('--fim', dest='end_date', default=None)
+    parser.add_argument('--janela', dest='window', type=int, default=WINDOW)
+    parser.add_argument('--min-treino', dest='min_train', type=int, default=500,
+                        help='Janelas usadas no primeiro treino')
+    parser.add_argument('--retreino', dest='retrain_every', type=int, default=63,
+                        help='Pregões entre re-treinos (tamanho de cada fold)')
+    parser.add_argument('--epocas', dest='epochs', type=int, default=10)
+    parser.add_argument('--epocas-retreino', dest='refit_epochs', type=int, default=3)
+    parser.add_argument('--sem-warm-start', dest='warm_start', action='store_false')
+    parser.add_argument('--batch-size', type=int, default=TRAINING_BATCH_SIZE)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    resultado = walk_forward_backtest(**vars(args))
+    print_report(resultado)
+
+    nome = f'backtest_{args.ticker.lower()}'
+    resultado['previsoes'].to_csv(f'{nome}.csv')
+    plot_backtest(resultado, plt.figure(figsize=(15, 10)))
+    plt.savefig(f'{nome}.png')
+    print(f"\nPrevisões salvas em '{nome}.csv' e gráfico em '{nome}.png'")
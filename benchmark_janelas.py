@@ -0,0 +1,41 @@
+import time
+import numpy as np
+from janelas import create_windows
+
+def create_windows_loop(data, time_steps=60):
+    """Implementação anterior com laço Python (referência)"""
+    X, y = [], []
+    for i in range(len(data) - time_steps):
+        X.append(data[i:(i + time_steps), 0])
+        y.append(data[i + time_steps, 0])
+    return np.array(X), np.array(y)
+
+def measure(func, repeats):
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    return (time.perf_counter() - start_time) / repeats, result
+
+def main(sizes=(1_500, 15_000, 150_000), repeats=5):
+    """Comparar o laço Python com as janelas por views"""
+    print(f"{'Amostras':>9} | {'Laço (ms)':>10} | {'Views (ms)':>10} | "
+          f"{'Lote 32 (ms)':>12} | {'Laço (MB)':>9} | {'Views (MB)':>10}")
+    print("-" * 75)
+    for size in sizes:
+        data = np.random.rand(size, 1)
+
+        loop_time, (X_loop, y_loop) = measure(lambda: create_windows_loop(data), repeats)
+        view_time, (X_view, y_view) = measure(lambda: create_windows(data), repeats)
+        batch_time, _ = measure(lambda: np.ascontiguousarray(X_view[:32]), repeats)
+
+        # Conferir que os resultados são idênticos
+        assert np.array_equal(X_loop, X_view[:, :, 0]) and np.array_equal(y_loop, y_view[:, 0])
+
+        # Views não alocam memória nova: apenas o array de origem é ocupado
+        view_bytes = 0 if np.shares_memory(X_view, data) else X_view.nbytes
+        print(f"{size:9d} | {loop_time * 1000:10.2f} | {view_time * 1000:10.3f} | "
+              f"{batch_time * 1000:12.3f} | {(X_loop.nbytes + y_loop.nbytes) / 1e6:9.1f} | "
+              f"{view_bytes / 1e6:10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import os
+import math
+import time
+import random
+import argparse
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import mlflow
+from armazenamento_precos import price_store
+from janelas import create_windows
+from processos import process_pool_kwargs
+
+# Espaço de busca padrão (valores candidatos por hiperparâmetro)
+SEARCH_SPACE = {
+    'window': [30, 60, 90],
+    'units': [32, 50, 64],
+    'dense_units': [16, 25, 32],
+    'batch_size': [16, 32, 64]
+}
+
+# Fração final das janelas de treino usada para validação
+VALIDATION_SPLIT = 0.1
+
+def sample_configs(space=None, n_trials=27, seed=None):
+    """Sortear até `n_trials` combinações distintas do espaço de busca"""
+    space = space or SEARCH_SPACE
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    return random.Random(seed).sample(grid, min(n_trials, len(grid)))
+
+def rung_schedule(min_epochs, max_epochs, eta):
+    """Épocas acumuladas ao fim de cada rodada: min_epochs, min_epochs * eta, ... até max_epochs"""
+    epochs = [min_epochs]
+    while epochs[-1] < max_epochs:
+        epochs.append(min(epochs[-1] * eta, max_epochs))
+    return epochs
+
+def n_survivors(n, eta):
+    """Trials que seguem para a próxima rodada: o melhor 1/eta, pelo menos um"""
+    return max(1, math.ceil(n / eta))
+
+def _run_trial(trial_id, config, closes, epochs_done, epochs, model_dir):
+    """Treinar um trial até `epochs` épocas, continuando do modelo salvo na rodada anterior"""
+    from tensorflow import keras
+    from criacao_modelo import build_model, make_dataset
+    inicio = time.perf_counter()
+
+    # Mesma divisão do treinamento: 80% iniciais, com o final cronológico como validação
+    train_data = closes[:int(np.ceil(len(closes) * 0.8))]
+    lo, hi = train_data.min(), train_data.max()
+    X, y = create_windows((train_data - lo) / (hi - lo), window=config['window'])
+    n_fit = len(X) - int(len(X) * VALIDATION_SPLIT)
+
+    # Modelo completo (com o estado do otimizador) salvo entre rodadas
+    path = os.path.join(model_dir, f'trial_{trial_id}.keras')
+    if epochs_done:
+        model = keras.models.load_model(path)
+    else:
+        model = build_model(config['window'], config['units'], config['dense_units'], horizon=1)
+
+    history = model.fit(make_dataset(X[:n_fit], y[:n_fit], config['batch_size'], shuffle=True),
+                        validation_data=make_dataset(X[n_fit:], y[n_fit:], config['batch_size']),
+                        initial_epoch=epochs_done, epochs=epochs, verbose=0)
+    model.save(path)
+
+    return {'trial_id': trial_id, 'epochs': epochs,
+            'val_loss': float(min(history.history['val_loss'])),
+            'val_loss_history': [float(v) for v in history.history['val_loss']],
+            'seconds': time.perf_counter() - inicio}
+
+def search(ticker='AMBA', start_date='2019-01-01', end_date=None, n_trials=27, min_epochs=2,
+           max_epochs=18, eta=3, space=None, max_workers=None, seed=None):
+    """Busca de hiperparâmetros por successive halving sobre a perda de validação
+
+    Todos os trials treinam `min_epochs` épocas; a cada rodada só o melhor 1/eta
+    continua, com eta vezes mais épocas acumuladas, até `max_epochs`. Cada trial
+    é um run aninhado no run da busca no MLflow.
+    """
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+    closes = price_store.get_history(ticker, start_date, end_date)['Close'].to_numpy(dtype='float64')
+    configs = sample_configs(space, n_trials, seed)
+    rungs = rung_schedule(min_epochs, max_epochs, eta)
+
+    mlflow.set_tracking_uri('file:' + os.path.join(os.getcwd(), 'mlruns'))
+    client = mlflow.tracking.MlflowClient()
+    inicio = time.perf_counter()
+
+    with mlflow.start_run(run_name=f'busca_{ticker}', tags={'ticker': ticker, 'tipo': 'busca'}) as parent, \
+            tempfile.TemporaryDirectory() as model_dir, \
+            ProcessPoolExecutor(**process_pool_kwargs(len(configs), max_workers)) as executor:
+        mlflow.log_params({'ticker': ticker, 'start_date': start_date, 'end_date': end_date,
+                           'n_trials': len(configs), 'min_epochs': min_epochs,
+                           'max_epochs': max_epochs, 'eta': eta})
+
+        trials = {}
+        for trial_id, config in enumerate(configs):
+            with mlflow.start_run(run_name=f'trial_{trial_id}', nested=True,
+                                  tags={'ticker': ticker, 'tipo': 'trial'}) as run:
+                mlflow.log_params(config)
+            trials[trial_id] = {'trial_id': trial_id, 'config': config, 'run_id': run.info.run_id,
+                                'epochs': 0, 'val_loss': None, 'seconds': 0.0}
+
+        ativos = list(trials)
+        for rodada, epochs in enumerate(rungs):
+            print(f"Rodada {rodada}: {len(ativos)} trials até {epochs} épocas")
+            futures = [executor.submit(_run_trial, trial_id, trials[trial_id]['config'], closes,
+                                       trials[trial_id]['epochs'], epochs, model_dir)
+                       for trial_id in ativos]
+            for future in futures:
+                resultado = future.result()
+                trial = trials[resultado['trial_id']]
+                for step, val_loss in enumerate(resultado['val_loss_history'], start=trial['epochs'] + 1):
+                    client.log_metric(trial['run_id'], 'val_loss', val_loss, step=step)
+                trial.update(epochs=resultado['epochs'], val_loss=resultado['val_loss'],
+                             seconds=trial['seconds'] + resultado['seconds'])
+
+            # Manter só o melhor 1/eta (pelo menos um) para a próxima rodada
+            ativos.sort(key=lambda trial_id: trials[trial_id]['val_loss'])
+            if rodada < len(rungs) - 1:
+                for trial_id in ativos[n_survivors(len(ativos), eta):]:
+                    client.set_tag(trials[trial_id]['run_id'], 'status', f'podado_rodada_{rodada}')
+                ativos = ativos[:n_survivors(len(ativos), eta)]
+
+        melhor = trials[ativos[0]]
+        for trial_id in ativos[1:]:
+            client.set_tag(trials[trial_id]['run_id'], 'status', 'finalista')
+        client.set_tag(melhor['run_id'], 'status', 'vencedor')
+
+        # Custo da busca em épocas, comparado a treinar todas as configurações até max_epochs
+        epocas_gastas = sum(trial['epochs'] for trial in trials.values())
+        resumo = {
+            'run_id': parent.info.run_id,
+            'melhor': melhor,
+            'trials': sorted(trials.values(), key=lambda t: (-t['epochs'], t['val_loss'])),
+            'rungs': rungs,
+            'epocas_gastas': epocas_gastas,
+            'fracao_custo': epocas_gastas / (len(configs) * max_epochs),
+            'wall_time': time.perf_counter() - inicio
+        }
+        mlflow.log_params({f'best_{k}': v for k, v in melhor['config'].items()})
+        mlflow.log_metrics({'best_val_loss': melhor['val_loss'], 'epocas_gastas': epocas_gastas,
+                            'fracao_custo': resumo['fracao_custo'], 'wall_time': resumo['wall_time']})
+        mlflow.set_tag('melhor_trial_run_id', melhor['run_id'])
+
+    return resumo
+
+def print_summary(resumo):
+    """Imprimir o ranking dos trials e o vencedor"""
+    print("\nResultados da Busca:")
+    print("\nTrial | Janela | LSTM | Densa | Batch | Épocas | Val loss  | Tempo (s)")
+    print("-" * 80)
+    for t in resumo['trials']:
+        c = t['config']
+        print(f"{t['trial_id']:5d} | {c['window']:6d} | {c['units']:4d} | {c['dense_units']:5d} | "
+              f"{c['batch_size']:5d} | {t['epochs']:6d} | {t['val_loss']:.3e} | {t['seconds']:9.1f}")
+
+    melhor = resumo['melhor']
+    print(f"\nMelhor configuração: {melhor['config']} (val loss {melhor['val_loss']:.3e})")
+    print(f"Épocas treinadas: {resumo['epocas_gastas']} "
+          f"({resumo['fracao_custo']:.0%} do custo de treinar todas até o fim), "
+          f"tempo total {resumo['wall_time']:.1f}s")
+
+def parse_args(argv=None):
+    """Argumentos da linha de comando da busca"""
+    parser = argparse.ArgumentParser(description='Busca de hiperparâmetros com successive halving')
+    parser.add_argument('--ticker', default='AMBA')
+    parser.add_argument('--inicio', dest='start_date', default='2019-01-01')
+    parser.add_argument('--fim', dest='end_date', default=None)
+    parser.add_argument('--trials', dest='n_trials', type=int, default=27)
+    parser.add_argument('--epocas-min', dest='min_epochs', type=int, default=2)
+    parser.add_argument('--epocas-max', dest='max_epochs', type=int, default=18)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--workers', dest='max_workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--treinar-vencedor', dest='train_winner', action='store_true',
+                        help='Treinar e registrar o modelo final com a melhor configuração')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = vars(parse_args())
+    train_winner = args.pop('train_winner')
+    resumo = search(**args)
+    print_summary(resumo)
+
+    if train_winner:
+        from criacao_modelo import train_model
+        train_model(ticker=args['ticker'], start_date=args['start_date'], end_date=args['end_date'],
+                    epochs=args['max_epochs'], tags={'busca_run_id': resumo['run_id']},
+                    **resumo['melhor']['config'])
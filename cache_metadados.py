@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class StaleWhileRevalidateCache:
+    """Cache que responde imediatamente com valores vencidos e os atualiza em segundo plano
+
+    Valores ausentes são obtidos de forma síncrona; valores vencidos são
+    devolvidos como estão enquanto um pool limitado de threads os atualiza.
+    Se `path` for informado, o conteúdo é gravado em JSON após cada
+    atualização e recarregado na inicialização (cache aquecido após reinícios).
+    Acima de `maxsize` chaves, as usadas há mais tempo são descartadas.
+    """
+
+    def __init__(self, ttl, path=None, max_refreshes=4, maxsize=512):
+        self.ttl = ttl
+        self.path = path
+        self.maxsize = maxsize
+        self._entries = self._load()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_refreshes)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return OrderedDict()
+        try:
+            with open(self.path) as f:
+                entries = sorted((entry['fetched_at'], key, entry['value']) for key, entry in json.load(f).items())
+        except Exception as e:
+            logger.warning(f"Cache {self.path} ignorado: {e}")
+            return OrderedDict()
+        # Manter as chaves atualizadas mais recentemente
+        return OrderedDict((key, (fetched_at, value)) for fetched_at, key, value in entries[-self.maxsize:])
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {key: {'fetched_at': fetched_at, 'value': value}
+                    for key, (fetched_at, value) in self._entries.items()}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        self._save()
+        return value
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar {key} em segundo plano: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key, fetch):
+        """Retornar o valor da chave, usando `fetch()` para obtê-lo ou atualizá-lo"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if entry is not None and time.time() - entry[0] >= self.ttl and key not in self._refreshing:
+                # Vencido: agendar uma única atualização e responder com o valor atual
+                self._refreshing.add(key)
+                self._executor.submit(self._refresh, key, fetch)
+
+        if entry is not None:
+            return entry[1]
+        return self._store(key, fetch())
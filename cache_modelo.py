@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import threading
+from motor_numpy import INFERENCE_ENGINE, load_from_run
+from perfil_inicializacao import timed_import
+from monitoramento import MODEL_LOAD_TIME, MODEL_CACHE_HITS, MODEL_CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (segundos) entre verificações de um run mais recente
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 30))
+
+# Tracking store local onde os treinamentos gravam os runs
+MLFLOW_TRACKING_URI = 'file:' + os.path.join(os.getcwd(), 'mlruns')
+
+_tracking = {'mlflow': None, 'lock': threading.Lock()}
+
+def get_mlflow():
+    """Importar o MLflow apontando para o tracking store local (configurado uma única vez)"""
+    with _tracking['lock']:
+        if _tracking['mlflow'] is None:
+            mlflow = timed_import('mlflow')
+            mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+            _tracking['mlflow'] = mlflow
+    return _tracking['mlflow']
+
+class ModelCache:
+    """Mantém em memória, por processo, o modelo LSTM de cada ticker, indexado pelo run_id"""
+
+    def __init__(self, check_interval=MODEL_CHECK_INTERVAL, artifact_path='modelo_lstm'):
+        self.check_interval = check_interval
+        self.artifact_path = artifact_path
+        # Por ticker, tupla (run_id, modelo) substituída atomicamente; previsões em
+        # andamento continuam usando a referência que já obtiveram
+        self._entries = {}
+        self._last_check = {}
+        # Modelos carregados por run_id: tickers servidos pelo mesmo run compartilham a instância
+        self._models = {}
+        # Uma trava por ticker, criada sob uma trava curta
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        # Funções chamadas quando um novo modelo substitui o anterior de um ticker
+        self._swap_listeners = []
+
+    def on_swap(self, callback):
+        """Registrar uma função chamada com (ticker, novo run_id) após cada troca de modelo"""
+        self._swap_listeners.append(callback)
+
+    def _ticker_lock(self, ticker):
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _load(self, run_id):
+        """Carrega o modelo do MLflow e registra o tempo de carga"""
+        start_time = time.time()
+        get_mlflow()
+        model = None
+        if INFERENCE_ENGINE == 'numpy':
+            try:
+                model = load_from_run(run_id)
+            except Exception as e:
+                logger.warning(f"Pesos NumPy indisponíveis para o run_id {run_id}, usando Keras: {e}")
+        if model is None:
+            model = timed_import('mlflow.keras').load_model(f"runs:/{run_id}/{self.artifact_path}")
+        load_time = time.time() - start_time
+        MODEL_LOAD_TIME.observe(load_time)
+        logger.info(f"Modelo do run_id {run_id} carregado em {load_time:.2f}s")
+        return model
+
+    def preload(self, ticker, run_id):
+        """Carregar o run apenas pelo motor NumPy (sem TensorFlow); falha se não houver o artefato"""
+        model = self._models.get(run_id)
+        if model is None:
+            start_time = time.time()
+            get_mlflow()
+            model = self._models[run_id] = load_from_run(run_id)
+            MODEL_LOAD_TIME.observe(time.time() - start_time)
+        self._entries[ticker] = (run_id, model)
+        self._last_check[ticker] = time.time()
+        return model
+
+    def _refresh(self, ticker):
+        """Verifica se há um run mais recente para o ticker e troca o modelo se necessário"""
+        from previsao_fechamento_acao import get_latest_model
+
+        run_id = get_latest_model(ticker)
+        self._last_check[ticker] = time.time()
+
+        entry = self._entries.get(ticker)
+        if entry is not None and entry[0] == run_id:
+            MODEL_CACHE_HITS.inc()
+            return entry
+
+        MODEL_CACHE_MISSES.inc()
+        model = self._models.get(run_id)
+        if model is None:
+            model = self._models[run_id] = self._load(run_id)
+        entry = (run_id, model)
+        self._entries[ticker] = entry
+
+        # Liberar os modelos que nenhum ticker usa mais
+        em_uso = {run_id for run_id, _ in list(self._entries.values())}
+        for antigo in [r for r in list(self._models) if r not in em_uso]:
+            self._models.pop(antigo, None)
+
+        for callback in self._swap_listeners:
+            callback(ticker, run_id)
+        return entry
+
+    def get_model(self, ticker=None):
+        """Retorna (run_id, modelo) do ticker (sem ticker, o modelo mais recente em geral)"""
+        ticker = ticker.upper() if ticker else None
+        entry = self._entries.get(ticker)
+        if entry is not None and time.time() - self._last_check.get(ticker, 0.0) < self.check_interval:
+            MODEL_CACHE_HITS.inc()
+            return entry
+
+        lock = self._ticker_lock(ticker)
+        if entry is None:
+            # Primeira carga do ticker: aguardar quem já estiver carregando
+            with lock:
+                if ticker in self._entries:
+                    MODEL_CACHE_HITS.inc()
+                    return self._entries[ticker]
+                return self._refresh(ticker)
+
+        # Já existe modelo: apenas uma thread verifica/troca, as demais seguem com o atual
+        if not lock.acquire(blocking=False):
+            MODEL_CACHE_HITS.inc()
+            return entry
+        try:
+            return self._refresh(ticker)
+        except Exception as e:
+            logger.error(f"Erro ao verificar novo modelo de {ticker}, mantendo run_id {entry[0]}: {e}")
+            MODEL_CACHE_HITS.inc()
+            return entry
+        finally:
+            lock.release()
+
+    def invalidate(self, ticker=None):
+        """Força nova verificação do run mais recente (de um ticker ou de todos) na próxima previsão"""
+        if ticker is None:
+            self._last_check.clear()
+        else:
+            self._last_check.pop(ticker.upper(), None)
+
+# Instância por processo (cada worker do gunicorn mantém a sua)
+model_cache = ModelCache()
@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from monitoramento import RESULT_CACHE_HITS, RESULT_CACHE_MISSES, RESULT_CACHE_COALESCED
+
+# Validade (segundos) e capacidade do cache de resultados de previsão
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 3600))
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 1024))
+
+class _Call:
+    """Cálculo em andamento compartilhado pelas requisições da mesma chave"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class ResultCache:
+    """Cache LRU com TTL e coalescência de requisições concorrentes (single-flight)"""
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, maxsize=RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Retornar o resultado da chave, calculando-o uma única vez se ausente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                RESULT_CACHE_HITS.inc()
+                return entry[1]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            # Outra requisição já está calculando esta chave: aguardar o resultado dela
+            RESULT_CACHE_COALESCED.inc()
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        RESULT_CACHE_MISSES.inc()
+        try:
+            call.result = compute()
+            with self._lock:
+                self._entries[key] = (time.time(), call.result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def invalidate(self, predicate=None):
+        """Remover todas as entradas (ou as que satisfazem `predicate(chave)`)"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+# Instância por processo
+result_cache = ResultCache()
@@ -0,0 +1,205 @@
+import os
+import time
+import random
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Endereço da API de cotações (configurável para apontar para um servidor local em testes)
+MARKET_DATA_BASE_URL = os.environ.get('MARKET_DATA_BASE_URL', 'https://query2.finance.yahoo.com')
+
+# Tempo limite de conexão e de leitura (segundos) de cada requisição
+MARKET_DATA_CONNECT_TIMEOUT = float(os.environ.get('MARKET_DATA_CONNECT_TIMEOUT', 5))
+MARKET_DATA_READ_TIMEOUT = float(os.environ.get('MARKET_DATA_READ_TIMEOUT', 15))
+
+# Requisições simultâneas, taxa sustentada (req/s) e rajada permitidas pelo token bucket
+MARKET_DATA_MAX_CONCURRENCY = int(os.environ.get('MARKET_DATA_MAX_CONCURRENCY', 8))
+MARKET_DATA_RATE = float(os.environ.get('MARKET_DATA_RATE', 5))
+MARKET_DATA_BURST = int(os.environ.get('MARKET_DATA_BURST', 10))
+
+# Novas tentativas (com espera exponencial a partir de MARKET_DATA_BACKOFF segundos,
+# limitada a MARKET_DATA_MAX_BACKOFF, inclusive quando o servidor pede mais via Retry-After)
+MARKET_DATA_RETRIES = int(os.environ.get('MARKET_DATA_RETRIES', 3))
+MARKET_DATA_BACKOFF = float(os.environ.get('MARKET_DATA_BACKOFF', 0.5))
+MARKET_DATA_MAX_BACKOFF = float(os.environ.get('MARKET_DATA_MAX_BACKOFF', 30))
+
+# Respostas que justificam nova tentativa
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+FETCH_LATENCY = Histogram('market_data_request_seconds', 'Latency of market data HTTP requests', ['endpoint'])
+FETCH_ERRORS = Counter('market_data_errors_total', 'Failed market data HTTP requests', ['endpoint', 'reason'])
+FETCH_RETRIES = Counter('market_data_retries_total', 'Retried market data HTTP requests', ['endpoint'])
+RATE_LIMIT_WAIT = Histogram('market_data_rate_limit_wait_seconds', 'Time spent waiting for a rate limit token')
+
+class MarketDataError(Exception):
+    """Falha ao obter dados de mercado após as novas tentativas"""
+
+class TokenBucket:
+    """Limitador de taxa: `rate` fichas por segundo, acumulando até `capacity`"""
+
+    def __init__(self, rate=MARKET_DATA_RATE, capacity=MARKET_DATA_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Consumir uma ficha, aguardando se necessário; retorna o tempo de espera"""
+        espera_total = 0.0
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (agora - self._updated) * self.rate)
+                self._updated = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return espera_total
+                espera = (1 - self._tokens) / self.rate
+            time.sleep(espera)
+            espera_total += espera
+
+class MarketDataClient:
+    """Cliente HTTP compartilhado para dados de mercado
+
+    Reutiliza conexões (requests.Session com pool), limita as requisições
+    simultâneas e a taxa (token bucket), aplica tempo limite a cada requisição
+    e repete falhas transitórias com espera exponencial.
+    """
+
+    def __init__(self, base_url=MARKET_DATA_BASE_URL, max_concurrency=MARKET_DATA_MAX_CONCURRENCY,
+                 rate=MARKET_DATA_RATE, burst=MARKET_DATA_BURST, retries=MARKET_DATA_RETRIES,
+                 backoff=MARKET_DATA_BACKOFF, max_backoff=MARKET_DATA_MAX_BACKOFF,
+                 timeout=(MARKET_DATA_CONNECT_TIMEOUT, MARKET_DATA_READ_TIMEOUT)):
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64)'
+
+    def _wait(self, attempt, response=None):
+        """Espera exponencial com jitter, respeitando Retry-After quando informado (até max_backoff)"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            espera = float(retry_after)
+        else:
+            espera = self.backoff * 2 ** attempt * (0.5 + random.random())
+        time.sleep(min(espera, self.max_backoff))
+
+    def get_json(self, path, params=None, endpoint='chart'):
+        """GET com limite de concorrência e taxa, tempo limite e novas tentativas"""
+        url = f"{self.base_url}{path}"
+        with self._slots:
+            for attempt in range(self.retries + 1):
+                RATE_LIMIT_WAIT.observe(self._bucket.acquire())
+                response = None
+                inicio = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                    FETCH_LATENCY.labels(endpoint).observe(time.perf_counter() - inicio)
+                    if response.ok:
+                        return response.json()
+                    if response.status_code not in RETRY_STATUS:
+                        FETCH_ERRORS.labels(endpoint, str(response.status_code)).inc()
+                        raise MarketDataError(f"{url}: HTTP {response.status_code} {response.text[:200]}")
+                    reason = str(response.status_code)
+                except requests.Timeout:
+                    FETCH_LATENCY.labels(endpoint).observe(time.perf_counter() - inicio)
+                    reason = 'timeout'
+                except requests.ConnectionError:
+                    FETCH_LATENCY.labels(endpoint).observe(time.perf_counter() - inicio)
+                    reason = 'connection'
+
+                FETCH_ERRORS.labels(endpoint, reason).inc()
+                if attempt == self.retries:
+                    raise MarketDataError(f"{url}: falha após {attempt + 1} tentativas ({reason})")
+                FETCH_RETRIES.labels(endpoint).inc()
+                logger.warning(f"{url}: tentativa {attempt + 1} falhou ({reason}), repetindo")
+                self._wait(attempt, response)
+
+    def fetch_history(self, ticker, start, end):
+        """Barras diárias OHLCV de [start, end) como DataFrame indexado por data"""
+        period1 = int(pd.Timestamp(str(start)).timestamp())
+        period2 = int(pd.Timestamp(str(end)).timestamp())
+        payload = self.get_json(f"/v8/finance/chart/{ticker}",
+                                params={'period1': period1, 'period2': period2,
+                                        'interval': '1d', 'events': 'div,splits'})
+        return parse_chart(payload, ticker)
+
+    def fetch_info(self, ticker):
+        """Dados cadastrais do ticker (nome, setor, indústria, market cap, volume médio)"""
+        payload = self.get_json(f"/v10/finance/quoteSummary/{ticker}",
+                                params={'modules': 'price,assetProfile,summaryDetail'},
+                                endpoint='quoteSummary')
+        return parse_quote_summary(payload, ticker)
+
+def parse_chart(payload, ticker):
+    """Converter a resposta do endpoint de gráfico em DataFrame OHLCV"""
+    chart = payload.get('chart') or {}
+    if chart.get('error'):
+        raise MarketDataError(f"{ticker}: {chart['error'].get('description', chart['error'])}")
+    resultado = (chart.get('result') or [None])[0]
+    if not resultado or not resultado.get('timestamp'):
+        return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+    # Datas no fuso da bolsa (gmtoffset em segundos)
+    offset = resultado.get('meta', {}).get('gmtoffset', 0)
+    datas = (np.asarray(resultado['timestamp'], dtype='int64') + offset).astype('datetime64[s]')
+    quote = resultado['indicators']['quote'][0]
+    dados = pd.DataFrame({
+        'Open': quote.get('open'),
+        'High': quote.get('high'),
+        'Low': quote.get('low'),
+        'Close': quote.get('close'),
+        'Volume': quote.get('volume')
+    }, index=pd.DatetimeIndex(datas.astype('datetime64[D]'), name='Date'), dtype='float64')
+    return dados
+
+def parse_quote_summary(payload, ticker):
+    """Converter a resposta do quoteSummary nos campos usados pelo relatório da ação"""
+    summary = payload.get('quoteSummary') or {}
+    if summary.get('error'):
+        raise MarketDataError(f"{ticker}: {summary['error'].get('description', summary['error'])}")
+    resultado = (summary.get('result') or [None])[0] or {}
+    price = resultado.get('price') or {}
+    profile = resultado.get('assetProfile') or {}
+    detail = resultado.get('summaryDetail') or {}
+
+    # Valores numéricos vêm como {'raw': ..., 'fmt': ...}
+    def raw(valor):
+        return valor.get('raw') if isinstance(valor, dict) else valor
+
+    return {
+        'longName': price.get('longName') or price.get('shortName'),
+        'sector': profile.get('sector'),
+        'industry': profile.get('industry'),
+        'marketCap': raw(price.get('marketCap')) or raw(detail.get('marketCap')),
+        'averageVolume3months': raw(price.get('averageDailyVolume3Month'))
+    }
+
+class MarketDataProvider:
+    """Fonte de dados do PriceStore usando o cliente HTTP compartilhado"""
+
+    def __init__(self, client=None):
+        self.client = client or market_data_client
+
+    def fetch(self, ticker, start, end):
+        return self.client.fetch_history(ticker, start, end)
+
+# Instância por processo (sessão, limites de concorrência e de taxa compartilhados)
+market_data_client = MarketDataClient()
@@ -1,38 +1,35 @@
+import sys
 import numpy as np
-import yfinance as yf
+from concurrent.futures import ProcessPoolExecutor
+from armazenamento_precos import price_store
+from janelas import create_windows
+from processos import process_pool_kwargs
 from sklearn.preprocessing import MinMaxScaler
-from tensorflow import keras
-from keras.models import Sequential
-from keras.layers import Dense, LSTM, Input
+from criacao_modelo import build_model, WINDOW, TRAINING_BATCH_SIZE
 import matplotlib.pyplot as plt
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from datetime import datetime, timedelta
+from datetime import datetime
 
-def create_model():
-    """Criar modelo LSTM com janela de 60 dias"""
-    model = Sequential([
-        Input(shape=(60, 1)),
-        LSTM(50, return_sequences=True),
-        LSTM(50, return_sequences=False),
-        Dense(25),
-        Dense(1)
-    ])
-    model.compile(optimizer='adam', loss='mean_squared_error')
-    return model
+def prepare_data(data, sequence_length=WINDOW):
+    """Preparar dados com a janela do modelo"""
+    X, y = create_windows(data, window=sequence_length)
+    return X, y[:, 0]
 
-def prepare_data(data, sequence_length=60):
-    """Preparar dados com janela de 60 dias"""
-    X, y = [], []
-    for i in range(len(data) - sequence_length):
-        X.append(data[i:(i + sequence_length), 0])
-        y.append(data[i + sequence_length, 0])
-    return np.array(X), np.array(y)
+# Períodos avaliados por padrão (nome -> 'INICIO' ou 'INICIO:FIM'; sem FIM, até a data final)
+DEFAULT_PERIODS = {
+    '2 anos': '2022-01-01',
+    '3 anos': '2021-01-01',
+    '4 anos': '2020-01-01',
+    '5 anos': '2019-01-01'
+}
 
-def evaluate_period(ticker, start_date, end_date=datetime.now().strftime('%Y-%m-%d')):
+def evaluate_period(ticker, start_date, end_date=None, dados=None):
     """Avaliar performance do modelo para um período específico"""
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
     try:
-        # Baixar dados
-        dados = yf.download(ticker, start=start_date, end=end_date)
+        # Obter dados do armazenamento local, se não recebidos já recortados
+        if dados is None:
+            dados = price_store.get_history(ticker, start_date, end_date)
         
         if len(dados) == 0:
             print(f"Nenhum dado encontrado para o período {start_date} a {end_date}")
@@ -63,16 +60,16 @@ def evaluate_period(ticker, start_date, end_date=datetime.now().strftime('%Y-%m-
         X_test, y_test = prepare_data(test_data)
         
         # Verificar se há dados suficientes após a preparação
-        if len(X_train) < 60 or len(X_test) < 1:
+        if len(X_train) < WINDOW or len(X_test) < 1:
             print(f"Sequências insuficientes para o período {start_date} a {end_date}")
             return None
         
         print("Treinando modelo...")
         # Treinar modelo
-        model = create_model()
+        model = build_model(horizon=1)
         history = model.fit(X_train, y_train, 
                           epochs=10, 
-                          batch_size=32, 
+                          batch_size=TRAINING_BATCH_SIZE, 
                           validation_split=0.1,
                           verbose=0)
         
@@ -105,27 +102,35 @@ def evaluate_period(ticker, start_date, end_date=datetime.now().strftime('%Y-%m-
         print(f"Erro ao avaliar período {start_date} a {end_date}: {str(e)}")
         return None
 
-def compare_periods(ticker='AMBA'):
+def compare_periods(ticker='AMBA', periods=None, end_date=None, max_workers=None):
     """Comparar diferentes períodos históricos"""
-    data_atual = datetime.now().strftime('%Y-%m-%d')
+    data_atual = end_date or datetime.now().strftime('%Y-%m-%d')
+    periods = periods or DEFAULT_PERIODS
     
-    # Definir períodos com datas fixas
-    periods = {
-        '2 anos': '2022-01-01',
-        '3 anos': '2021-01-01',
-        '4 anos': '2020-01-01',
-        '5 anos': '2019-01-01'
-    }
+    intervals = {name: split_period(period, data_atual) for name, period in periods.items()}
     
     print(f"Análise para {ticker}")
     print(f"Data final: {data_atual}")
     
+    # Uma única leitura cobrindo todos os períodos, recortada em memória para cada um
+    dados_completos = price_store.get_history(ticker, min(inicio for inicio, _ in intervals.values()),
+                                              max(fim for _, fim in intervals.values()))
+    
+    # Distribuir os treinamentos entre processos, dividindo os núcleos entre eles
     results = {}
-    for period_name, start_date in periods.items():
-        print(f"\nAvaliando período: {period_name}")
-        metrics = evaluate_period(ticker, start_date, data_atual)
-        if metrics is not None:
-            results[period_name] = metrics
+    with ProcessPoolExecutor(**process_pool_kwargs(len(periods), max_workers)) as executor:
+        futures = {}
+        for period_name, (start_date, period_end) in intervals.items():
+            print(f"\nAvaliando período: {period_name} ({start_date} a {period_end})")
+            dados = dados_completos[(dados_completos.index >= start_date) &
+                                    (dados_completos.index < period_end)]
+            futures[period_name] = executor.submit(evaluate_period, ticker, start_date, period_end, dados)
+        
+        # Manter a ordem dos períodos configurados
+        for period_name, future in futures.items():
+            metrics = future.result()
+            if metrics is not None:
+                results[period_name] = metrics
     
     if not results:
         print("Nenhum período forneceu dados suficientes para análise")
@@ -179,8 +184,23 @@ def compare_periods(ticker='AMBA'):
     print(f"\nMelhor período baseado no Teste MAE: {best_period[0]}")
     print(f"MAE do teste: ${best_period[1]['test_mae']:.2f}")
     
-    plt.savefig('comparacao_periodos_amba.png')
+    plt.savefig(f'comparacao_periodos_{ticker.lower()}.png')
     plt.show()
 
+def split_period(period, end_date):
+    """Converter 'INICIO[:FIM]' em (início, fim); sem FIM, o período vai até end_date"""
+    start_date, _, period_end = period.partition(':')
+    return start_date, period_end or end_date
+
+def parse_periods(args):
+    """Converter argumentos no formato 'nome=INICIO[:FIM]' (datas AAAA-MM-DD) em um dicionário de períodos"""
+    periods = {}
+    for arg in args:
+        name, period = arg.split('=', 1)
+        periods[name] = period
+    return periods
+
 if __name__ == "__main__":
-    compare_periods()
\ No newline at end of file
+    # Uso: python comparacao_periodos.py [TICKER] ["2 anos=2022-01-01" "2020=2020-01-01:2021-01-01" ...]
+    ticker = sys.argv[1] if len(sys.argv) > 1 else 'AMBA'
+    compare_periods(ticker, parse_periods(sys.argv[2:]) or None)
\ No newline at end of file
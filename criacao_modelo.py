@@ -1,20 +1,40 @@
 import os
+import time
+import argparse
+import tempfile
 import numpy as np
 import mlflow
 import mlflow.keras
 from mlflow.models import ModelSignature
 from mlflow.types.schema import Schema, TensorSpec
+import tensorflow as tf
 from tensorflow import keras
 from keras.models import Sequential
 from keras.layers import Dense, LSTM, Input
-import yfinance as yf
 from sklearn.preprocessing import MinMaxScaler
 import matplotlib.pyplot as plt
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.metrics import mean_absolute_error, mean_squared_error
 from datetime import datetime
+from registro_modelos import register_run
+from armazenamento_precos import price_store
+from janelas import create_windows
+from motor_numpy import export_weights, NUMPY_ARTIFACT_FILE, NUMPY_ARTIFACT_PATH
 
-# Configurar MLflow
-mlflow.set_tracking_uri('file:' + os.path.join(os.getcwd(), 'mlruns'))
+# Número de fechamentos futuros previstos de uma só vez pela camada de saída
+HORIZON = int(os.environ.get('FORECAST_HORIZON', 1))
+
+# Arquitetura padrão: janela de entrada, unidades das duas LSTMs e da camada densa intermediária
+WINDOW = int(os.environ.get('MODEL_WINDOW', 60))
+LSTM_UNITS = int(os.environ.get('MODEL_LSTM_UNITS', 50))
+DENSE_UNITS = int(os.environ.get('MODEL_DENSE_UNITS', 25))
+
+# Hiperparâmetros padrão do treinamento (sobrescritos pela CLI ou pelos parâmetros da tarefa)
+TRAINING_EPOCHS = int(os.environ.get('TRAINING_EPOCHS', 20))
+TRAINING_BATCH_SIZE = int(os.environ.get('TRAINING_BATCH_SIZE', 32))
+EARLY_STOPPING_PATIENCE = int(os.environ.get('EARLY_STOPPING_PATIENCE', 3))
+
+# Diretório dos checkpoints (melhores pesos por run)
+TRAINING_CHECKPOINT_DIR = os.environ.get('TRAINING_CHECKPOINT_DIR', os.path.join(os.getcwd(), 'checkpoints'))
 
 # Configurar ambiente conda
 conda_env = {
@@ -32,162 +52,269 @@ conda_env = {
     'name': 'lstm_env'
 }
 
-with mlflow.start_run() as run:
-    run_id = run.info.run_id
-    print(f"O run_id é: {run_id}")
-
-    # Baixar dados
-    ticker = 'AMBA'
-    print(f"Baixando dados históricos para o ticker: {ticker}")
-    dados_historicos = yf.download(ticker, start='2019-01-01', end=datetime.now().strftime('%Y-%m-%d'))
-    
-    # Processar dados
-    data = dados_historicos['Close'].values.reshape(-1, 1)
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(data)
-    
-    # Preparar dados de treinamento e teste
-    training_data_len = int(np.ceil(len(scaled_data) * 0.8))
-    train_data = scaled_data[0:training_data_len, :]
-    test_data = scaled_data[training_data_len:, :]
-
-    # Função para criar dataset
-    def create_dataset(data, time_steps=60):
-        X, y = [], []
-        for i in range(len(data) - time_steps):
-            X.append(data[i:(i + time_steps), 0])
-            y.append(data[i + time_steps, 0])
-        return np.array(X), np.array(y)
-
-    # Criar datasets de treino e teste
-    X_train, y_train = create_dataset(train_data)
-    X_test, y_test = create_dataset(test_data)
-
-    # Reshape para o formato [amostras, time steps, features]
-    X_train = np.reshape(X_train, (X_train.shape[0], X_train.shape[1], 1))
-    X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
-
-    # Criar e treinar modelo
+def build_model(window=WINDOW, units=LSTM_UNITS, dense_units=DENSE_UNITS, horizon=HORIZON):
+    """Criar o modelo LSTM empilhado (LSTM -> LSTM -> Dense -> Dense(horizonte))"""
     model = Sequential([
-        Input(shape=(60, 1), name='input_1'),
-        LSTM(50, return_sequences=True),
-        LSTM(50, return_sequences=False),
-        Dense(25),
-        Dense(1)
+        Input(shape=(window, 1), name='input_1'),
+        LSTM(units, return_sequences=True),
+        LSTM(units, return_sequences=False),
+        Dense(dense_units),
+        Dense(horizon)
     ])
-
     model.compile(optimizer='adam', loss='mean_squared_error')
-    history = model.fit(X_train, y_train, batch_size=1, epochs=1, verbose=1)
+    return model
+
+def make_dataset(X, y, batch_size, shuffle=False):
+    """Pipeline tf.data: janelas em cache, embaralhadas por época, em lotes e com prefetch"""
+    dataset = tf.data.Dataset.from_tensor_slices((X.astype('float32'), y.astype('float32'))).cache()
+    if shuffle:
+        dataset = dataset.shuffle(len(X), reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
 
-    # Fazer previsões
-    train_predict = model.predict(X_train)
-    test_predict = model.predict(X_test)
+class ThroughputCallback(keras.callbacks.Callback):
+    """Registrar no MLflow o tempo e as amostras/s de cada época"""
 
-    # Inverter normalização
-    train_predict = scaler.inverse_transform(train_predict)
-    y_train_inv = scaler.inverse_transform([y_train])
-    test_predict = scaler.inverse_transform(test_predict)
-    y_test_inv = scaler.inverse_transform([y_test])
+    def __init__(self, n_samples):
+        super().__init__()
+        self.n_samples = n_samples
+        self.epoch_times = []
 
-    # Criar figura com dois subplots lado a lado
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        self.epoch_times.append(elapsed)
+        mlflow.log_metrics({
+            'epoch_seconds': elapsed,
+            'samples_per_sec': self.n_samples / elapsed if elapsed > 0 else 0.0
+        }, step=epoch)
+
+def _plot_predictions(ticker, start_date, end_date, train_dates, test_dates,
+                      y_train_inv, train_predict, y_test_inv, test_predict, metrics):
+    """Gráfico de previsão vs real nos conjuntos de treino e teste"""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(24, 10))
-    fig.suptitle(f'Previsão vs Valor Real - {ticker} (2019-2024)', fontsize=16)
-
-    # Datas para os gráficos
-    train_dates = dados_historicos.index[60:training_data_len]
-    test_dates = dados_historicos.index[training_data_len+60:len(dados_historicos)]
-
-    # Plotar dados de treino (gráfico da esquerda)
-    ax1.plot(train_dates, y_train_inv.T, 'b', label='Real', linewidth=2)
-    ax1.plot(train_dates, train_predict, 'r--', label='Previsto', linewidth=2)
-    ax1.set_title('Dados de Treinamento', fontsize=14)
-    ax1.set_xlabel('Data', fontsize=12)
-    ax1.set_ylabel('Preço ($)', fontsize=12)
-    ax1.legend(fontsize=12)
-    ax1.grid(True, which='both', linestyle='--', alpha=0.6)
-    ax1.tick_params(axis='x', rotation=45)
-    
-    # Calcular métricas
-    train_mae = mean_absolute_error(y_train_inv.T, train_predict)
-    train_rmse = np.sqrt(mean_squared_error(y_train_inv.T, train_predict))
-    test_mae = mean_absolute_error(y_test_inv.T, test_predict)
-    test_rmse = np.sqrt(mean_squared_error(y_test_inv.T, test_predict))
-    
-    # Adicionar métricas de treino
-    train_metrics = f'Métricas de Treino:\nMAE: ${train_mae:.2f}\nRMSE: ${train_rmse:.2f}'
-    ax1.text(0.02, 0.98, train_metrics, 
-             transform=ax1.transAxes,
-             verticalalignment='top',
-             bbox=dict(facecolor='white', alpha=0.8),
-             fontsize=10)
-
-    # Plotar dados de teste (gráfico da direita)
-    ax2.plot(test_dates, y_test_inv.T, 'g', label='Real', linewidth=2)
-    ax2.plot(test_dates, test_predict, 'orange', label='Previsto', linewidth=2)
-    ax2.set_title('Dados de Teste', fontsize=14)
-    ax2.set_xlabel('Data', fontsize=12)
-    ax2.set_ylabel('Preço ($)', fontsize=12)
-    ax2.legend(fontsize=12)
-    ax2.grid(True, which='both', linestyle='--', alpha=0.6)
-    ax2.tick_params(axis='x', rotation=45)
-    
-    # Adicionar métricas de teste
-    test_metrics = f'Métricas de Teste:\nMAE: ${test_mae:.2f}\nRMSE: ${test_rmse:.2f}'
-    ax2.text(0.02, 0.98, test_metrics, 
-             transform=ax2.transAxes,
-             verticalalignment='top',
-             bbox=dict(facecolor='white', alpha=0.8),
-             fontsize=10)
-
-    # Ajustar layout
-    plt.tight_layout()
-    
-    # Salvar o gráfico
-    plt.savefig('previsoes_completas.png', dpi=300, bbox_inches='tight')
-    
-    # Log do gráfico e métricas no MLflow
-    mlflow.log_artifact('previsoes_completas.png')
-    mlflow.log_metrics({
-        "train_mae": train_mae,
-        "train_rmse": train_rmse,
-        "test_mae": test_mae,
-        "test_rmse": test_rmse
-    })
-
-    # Definir assinatura do modelo
-    signature = ModelSignature(
-        inputs=Schema([
-            TensorSpec(np.dtype('float32'), (-1, 60, 1), name='input_1')
-        ]),
-        outputs=Schema([
-            TensorSpec(np.dtype('float32'), (-1, 1), name='output')
-        ])
-    )
-
-    try:
-        # Log parâmetros e modelo
-        mlflow.log_param("ticker", ticker)
-        mlflow.log_param("epochs", 1)
-        mlflow.log_param("batch_size", 1)
-
-        mlflow.keras.log_model(
-            model,
-            "modelo_lstm",
-            signature=signature,
-            conda_env=conda_env
+    fig.suptitle(f'Previsão vs Valor Real - {ticker} ({start_date[:4]}-{end_date[:4]})', fontsize=16)
+
+    paineis = [
+        (ax1, train_dates, y_train_inv, train_predict, 'b', 'r--', 'Dados de Treinamento', 'Treino', 'train'),
+        (ax2, test_dates, y_test_inv, test_predict, 'g', 'orange', 'Dados de Teste', 'Teste', 'test')
+    ]
+    for ax, dates, real, previsto, cor_real, cor_prev, titulo, nome, prefixo in paineis:
+        ax.plot(dates, real, cor_real, label='Real', linewidth=2)
+        ax.plot(dates, previsto, cor_prev, label='Previsto', linewidth=2)
+        ax.set_title(titulo, fontsize=14)
+        ax.set_xlabel('Data', fontsize=12)
+        ax.set_ylabel('Preço ($)', fontsize=12)
+        ax.legend(fontsize=12)
+        ax.grid(True, which='both', linestyle='--', alpha=0.6)
+        ax.tick_params(axis='x', rotation=45)
+
+        # Adicionar métricas do conjunto
+        texto = (f'Métricas de {nome}:\nMAE: ${metrics[prefixo + "_mae"]:.2f}\n'
+                 f'RMSE: ${metrics[prefixo + "_rmse"]:.2f}')
+        ax.text(0.02, 0.98, texto,
+                transform=ax.transAxes,
+                verticalalignment='top',
+                bbox=dict(facecolor='white', alpha=0.8),
+                fontsize=10)
+
+    fig.tight_layout()
+    return fig
+
+def train_model(ticker='AMBA', start_date='2019-01-01', end_date=None, window=WINDOW,
+                horizon=HORIZON, batch_size=TRAINING_BATCH_SIZE, epochs=TRAINING_EPOCHS,
+                units=LSTM_UNITS, dense_units=DENSE_UNITS, patience=EARLY_STOPPING_PATIENCE,
+                validation_split=0.1, checkpoint_dir=TRAINING_CHECKPOINT_DIR,
+                plot_path='previsoes_completas.png', show_plot=False, callbacks=None,
+                tags=None):
+    """Treinar, avaliar e registrar no MLflow um modelo para o ticker; retorna run_id e métricas"""
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+
+    # Configurar MLflow
+    mlflow.set_tracking_uri('file:' + os.path.join(os.getcwd(), 'mlruns'))
+
+    with mlflow.start_run(tags=tags) as run:
+        run_id = run.info.run_id
+        print(f"O run_id é: {run_id}")
+        mlflow.log_params({
+            "ticker": ticker, "start_date": start_date, "end_date": end_date,
+            "window": window, "horizon": horizon, "batch_size": batch_size,
+            "epochs": epochs, "units": units, "dense_units": dense_units,
+            "patience": patience
+        })
+
+        # Baixar dados
+        print(f"Baixando dados históricos para o ticker: {ticker}")
+        dados_historicos = price_store.get_history(ticker, start_date, end_date)
+
+        # Processar dados
+        data = dados_historicos['Close'].values.reshape(-1, 1)
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled_data = scaler.fit_transform(data)
+
+        # Preparar dados de treinamento e teste
+        training_data_len = int(np.ceil(len(scaled_data) * 0.8))
+        train_data = scaled_data[0:training_data_len, :]
+        test_data = scaled_data[training_data_len:, :]
+
+        # Criar datasets de treino e teste no formato [amostras, time steps, features]
+        # y tem formato [amostras, horizonte]
+        X_train, y_train = create_windows(train_data, window=window, horizon=horizon)
+        X_test, y_test = create_windows(test_data, window=window, horizon=horizon)
+
+        # Validação: final cronológico das janelas de treino (sem vazar o futuro)
+        n_fit = len(X_train) - int(len(X_train) * validation_split)
+        train_dataset = make_dataset(X_train[:n_fit], y_train[:n_fit], batch_size, shuffle=True)
+        val_dataset = make_dataset(X_train[n_fit:], y_train[n_fit:], batch_size)
+
+        # Criar e treinar modelo
+        model = build_model(window, units, dense_units, horizon)
+
+        # Melhor época salva em checkpoint e restaurada ao final
+        checkpoint_path = os.path.join(checkpoint_dir, run_id, 'melhor.weights.h5')
+        os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        throughput = ThroughputCallback(n_fit)
+        callbacks = [
+            throughput,
+            keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience),
+            keras.callbacks.ModelCheckpoint(checkpoint_path, monitor='val_loss',
+                                            save_best_only=True, save_weights_only=True),
+            *(callbacks or [])
+        ]
+
+        inicio = time.perf_counter()
+        history = model.fit(train_dataset, validation_data=val_dataset, epochs=epochs,
+                            verbose=2, callbacks=callbacks)
+        train_seconds = time.perf_counter() - inicio
+        if os.path.exists(checkpoint_path):
+            model.load_weights(checkpoint_path)
+
+        # Fazer previsões
+        train_predict = model.predict(X_train, batch_size=max(batch_size, 256), verbose=0)
+        test_predict = model.predict(X_test, batch_size=max(batch_size, 256), verbose=0)
+
+        # Inverter normalização de todos os passos do horizonte
+        def inverse_transform(values):
+            return scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+
+        train_predict_h = inverse_transform(train_predict)
+        y_train_h = inverse_transform(y_train)
+        test_predict_h = inverse_transform(test_predict)
+        y_test_h = inverse_transform(y_test)
+
+        # Gráficos e métricas principais usam o próximo dia (primeiro passo do horizonte)
+        train_predict = train_predict_h[:, :1]
+        y_train_inv = y_train_h[:, :1]
+        test_predict = test_predict_h[:, :1]
+        y_test_inv = y_test_h[:, :1]
+
+        # Calcular métricas
+        metrics = {
+            "train_mae": mean_absolute_error(y_train_inv, train_predict),
+            "train_rmse": np.sqrt(mean_squared_error(y_train_inv, train_predict)),
+            "test_mae": mean_absolute_error(y_test_inv, test_predict),
+            "test_rmse": np.sqrt(mean_squared_error(y_test_inv, test_predict))
+        }
+        # Métricas médias sobre todo o horizonte
+        if horizon > 1:
+            metrics["test_mae_horizonte"] = mean_absolute_error(y_test_h, test_predict_h)
+            metrics["test_rmse_horizonte"] = np.sqrt(mean_squared_error(y_test_h, test_predict_h))
+
+        # Vazão do treinamento
+        epochs_run = len(throughput.epoch_times)
+        metrics["train_wall_seconds"] = train_seconds
+        metrics["epochs_run"] = epochs_run
+        metrics["samples_per_sec"] = n_fit * epochs_run / train_seconds if train_seconds > 0 else 0.0
+
+        # Datas para os gráficos
+        train_dates = dados_historicos.index[window:window + len(y_train)]
+        test_dates = dados_historicos.index[training_data_len + window:training_data_len + window + len(y_test)]
+
+        # Salvar o gráfico
+        fig = _plot_predictions(ticker, start_date, end_date, train_dates, test_dates,
+                                y_train_inv, train_predict, y_test_inv, test_predict, metrics)
+        fig.savefig(plot_path, dpi=300, bbox_inches='tight')
+        if not show_plot:
+            plt.close(fig)
+
+        # Log do gráfico e métricas no MLflow
+        mlflow.log_artifact(plot_path)
+        mlflow.log_metrics(metrics)
+
+        # Definir assinatura do modelo
+        signature = ModelSignature(
+            inputs=Schema([
+                TensorSpec(np.dtype('float32'), (-1, window, 1), name='input_1')
+            ]),
+            outputs=Schema([
+                TensorSpec(np.dtype('float32'), (-1, horizon), name='output')
+            ])
         )
-        print("Modelo registrado no MLflow.")
-        
-        # Imprimir métricas
-        print(f"\nMétricas de Avaliação:")
-        print(f"Treino - MAE: ${train_mae:.2f}, RMSE: ${train_rmse:.2f}")
-        print(f"Teste - MAE: ${test_mae:.2f}, RMSE: ${test_rmse:.2f}")
 
-    except Exception as e:
-        print(f"Erro ao registrar modelo: {e}")
-        raise
+        try:
+            mlflow.keras.log_model(
+                model,
+                "modelo_lstm",
+                signature=signature,
+                conda_env=conda_env
+            )
+            print("Modelo registrado no MLflow.")
+
+            # Exportar pesos para o motor de inferência NumPy (serviço sem TensorFlow)
+            # (em diretório temporário: vários treinamentos podem rodar em paralelo)
+            with tempfile.TemporaryDirectory() as tmp:
+                npz_path = os.path.join(tmp, NUMPY_ARTIFACT_FILE)
+                export_weights(model, npz_path)
+                mlflow.log_artifact(npz_path, artifact_path=NUMPY_ARTIFACT_PATH)
+
+            # Atualizar índice local usado pela API para localizar o modelo
+            register_run(
+                run_id=run_id,
+                ticker=ticker,
+                start_time=run.info.start_time,
+                metrics=metrics,
+                artifact_uri=mlflow.get_artifact_uri("modelo_lstm"),
+                params={"epochs": epochs, "batch_size": batch_size, "horizon": horizon,
+                        "window": window, "units": units, "start_date": start_date,
+                        "end_date": end_date}
+            )
+
+            # Imprimir métricas
+            print(f"\nMétricas de Avaliação:")
+            print(f"Treino - MAE: ${metrics['train_mae']:.2f}, RMSE: ${metrics['train_rmse']:.2f}")
+            print(f"Teste - MAE: ${metrics['test_mae']:.2f}, RMSE: ${metrics['test_rmse']:.2f}")
+            print(f"Vazão: {metrics['samples_per_sec']:.0f} amostras/s em {epochs_run} épocas "
+                  f"({train_seconds:.1f}s)")
+
+        except Exception as e:
+            print(f"Erro ao registrar modelo: {e}")
+            raise
+
+    print("Execução do MLflow finalizada.")
+    return {'run_id': run_id, 'ticker': ticker, 'metrics': metrics,
+            'history': {k: [float(v) for v in values] for k, values in history.history.items()}}
+
+def parse_args(argv=None):
+    """Argumentos da linha de comando do treinamento"""
+    parser = argparse.ArgumentParser(description='Treinar o modelo LSTM de previsão de fechamento')
+    parser.add_argument('--ticker', default='AMBA')
+    parser.add_argument('--inicio', dest='start_date', default='2019-01-01', help='Data inicial (AAAA-MM-DD)')
+    parser.add_argument('--fim', dest='end_date', default=None, help='Data final (padrão: hoje)')
+    parser.add_argument('--janela', dest='window', type=int, default=WINDOW)
+    parser.add_argument('--horizonte', dest='horizon', type=int, default=HORIZON)
+    parser.add_argument('--batch-size', type=int, default=TRAINING_BATCH_SIZE)
+    parser.add_argument('--epocas', dest='epochs', type=int, default=TRAINING_EPOCHS)
+    parser.add_argument('--unidades', dest='units', type=int, default=LSTM_UNITS)
+    parser.add_argument('--unidades-densa', dest='dense_units', type=int, default=DENSE_UNITS)
+    parser.add_argument('--paciencia', dest='patience', type=int, default=EARLY_STOPPING_PATIENCE)
+    parser.add_argument('--mostrar-grafico', dest='show_plot', action='store_true')
+    return parser.parse_args(argv)
 
-print("Execução do MLflow finalizada.")
+if __name__ == '__main__':
+    args = parse_args()
+    resultado = train_model(**vars(args))
 
-# Mostrar o gráfico
-plt.show()
\ No newline at end of file
+    # Mostrar o gráfico
+    if args.show_plot:
+        plt.show()
@@ -0,0 +1,123 @@
+import math
+import time
+import threading
+import numpy as np
+
+class LogHistogram:
+    """Histograma com faixas logarítmicas para estimar quantis com erro relativo limitado
+
+    Cada faixa cobre [gamma^(i-1), gamma^i), com gamma = (1 + a) / (1 - a), de modo
+    que qualquer quantil estimado fica a no máximo `relative_accuracy` do valor real.
+    Histogramas com a mesma configuração podem ser somados (janelas deslizantes).
+    """
+
+    def __init__(self, min_value=1e-4, max_value=1e4, relative_accuracy=0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._offset = math.floor(math.log(min_value) / self._log_gamma)
+        self.size = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1
+
+    def index(self, value):
+        """Faixa do valor (valores fora do intervalo vão para as faixas extremas)"""
+        if value <= 0:
+            return 0
+        i = math.ceil(math.log(value) / self._log_gamma) - self._offset
+        return min(max(i, 0), self.size - 1)
+
+    def value(self, index):
+        """Valor representativo da faixa"""
+        return 2 * self.gamma ** (index + self._offset) / (self.gamma + 1)
+
+    def quantile(self, counts, q):
+        total = counts.sum()
+        if total == 0:
+            return None
+        index = int(np.searchsorted(np.cumsum(counts), q * (total - 1) + 1))
+        return self.value(min(index, self.size - 1))
+
+class RunningStats:
+    """Contagem, média, variância (Welford), mínimo e máximo, combináveis entre si"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'counts')
+
+    def __init__(self, histogram=None):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.counts = np.zeros(histogram.size, dtype=np.int64) if histogram else None
+
+    def add(self, value, histogram=None):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if self.counts is not None:
+            self.counts[histogram.index(value)] += 1
+
+    def merge(self, other):
+        """Combinar com outro acumulador (fórmula de Chan para a variância)"""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.counts is not None:
+            self.counts += other.counts
+
+    def summary(self, histogram=None):
+        if self.count == 0:
+            return {'count': 0}
+        result = {
+            'count': self.count,
+            'mean': float(self.mean),
+            'std': math.sqrt(self.m2 / self.count),
+            'min': float(self.min),
+            'max': float(self.max)
+        }
+        if self.counts is not None:
+            for q in (0.5, 0.95, 0.99):
+                # Limitar a estimativa ao intervalo realmente observado
+                value = histogram.quantile(self.counts, q)
+                result[f'p{int(q * 100)}'] = min(max(value, self.min), self.max)
+        return result
+
+class SlidingWindowStats:
+    """Estatísticas de uma janela de tempo deslizante, em memória fixa
+
+    A janela é dividida em `buckets` intervalos; cada observação atualiza o
+    intervalo corrente e a consulta combina os intervalos ainda na janela.
+    """
+
+    def __init__(self, window_seconds, buckets=60, histogram=None):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self.histogram = histogram
+        self._slots = [(None, None)] * buckets
+        self._lock = threading.Lock()
+
+    def add(self, value, timestamp=None):
+        bucket_id = int((timestamp or time.time()) // self.bucket_seconds)
+        slot = bucket_id % len(self._slots)
+        with self._lock:
+            current_id, stats = self._slots[slot]
+            if current_id != bucket_id:
+                stats = RunningStats(self.histogram)
+                self._slots[slot] = (bucket_id, stats)
+            stats.add(value, self.histogram)
+
+    def summary(self, timestamp=None):
+        bucket_id = int((timestamp or time.time()) // self.bucket_seconds)
+        total = RunningStats(self.histogram)
+        with self._lock:
+            for slot_id, stats in self._slots:
+                if slot_id is not None and bucket_id - slot_id < len(self._slots):
+                    total.merge(stats)
+        return total.summary(self.histogram)
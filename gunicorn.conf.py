@@ -0,0 +1,76 @@
+import os
+import shutil
+
+# Configuração do gunicorn usada pelo start.sh
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+# Workers com threads: o progresso por Server-Sent Events mantém a requisição aberta
+# durante todo o treinamento e ocupa apenas uma thread, não o worker inteiro. Nesse
+# modelo o timeout vale para o worker travado, não para a duração de cada requisição.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Carregar a aplicação (e o modelo) no master antes do fork: os workers compartilham
+# os pesos por copy-on-write em vez de cada um carregar sua própria cópia
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Porta do exportador Prometheus (alvo do prometheus.yml)
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 8000))
+
+# Métricas compartilhadas entre workers: cada processo grava seus valores em
+# arquivos mapeados em memória neste diretório. Precisa existir antes de qualquer
+# import do prometheus_client (o preload importa a aplicação antes do on_starting).
+# Este arquivo é relido a cada HUP, por isso a limpeza fica no on_starting.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+def _clear_stale_metrics(directory):
+    """Descartar os arquivos de métricas de execuções anteriores (mantém os deste master)"""
+    current = f"_{os.getpid()}.db"
+    for name in os.listdir(directory):
+        if not name.endswith(current):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+def on_starting(server):
+    """Limpar métricas antigas e, com preload, carregar no master os modelos servidos"""
+    _clear_stale_metrics(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+    if not preload_app:
+        return
+    try:
+        from cache_modelo import model_cache
+        from motor_numpy import INFERENCE_ENGINE
+        from registro_modelos import get_served_runs
+        served = get_served_runs() if INFERENCE_ENGINE == 'numpy' else {}
+    except Exception as e:
+        server.log.warning(f"Modelos não pré-carregados: {e}")
+        return
+    # Apenas pesos NumPy: o TensorFlow nunca é carregado no master; runs sem o
+    # artefato são carregados por cada worker no aquecimento
+    for ticker, run_id in served.items():
+        try:
+            model_cache.preload(ticker, run_id)
+            server.log.info(f"Modelo do run_id {run_id} ({ticker or 'geral'}) pré-carregado no master")
+        except Exception as e:
+            server.log.info(f"Run {run_id} ({ticker or 'geral'}) sem pesos NumPy, não pré-carregado: {e}")
+
+def post_worker_init(worker):
+    """Executar a inferência de aquecimento em cada worker; /health fica pronto ao final"""
+    from app import start_warm_up
+    start_warm_up()
+
+def when_ready(server):
+    """Iniciar no processo master o exportador que agrega as métricas de todos os workers"""
+    from monitoramento import start_monitoring_server
+    start_monitoring_server(METRICS_PORT)
+    server.log.info(f"Exportador Prometheus iniciado na porta {METRICS_PORT}")
+
+def child_exit(server, worker):
+    """Descartar as métricas 'live' de workers encerrados"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
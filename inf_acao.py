@@ -1,16 +1,48 @@
-import yfinance as yf
+import os
+from armazenamento_precos import price_store, PRICE_PROVIDER
+from cache_metadados import StaleWhileRevalidateCache
+from servico_graficos import chart_service, chart_key
+from perfil_inicializacao import timed_import
 from datetime import datetime, timedelta
 import pandas as pd
-import matplotlib.pyplot as plt
+
+# Validade dos dados cadastrais (nome, setor, indústria, market cap) e dos preços de 5 dias
+STOCK_INFO_TTL = float(os.environ.get('STOCK_INFO_TTL', 24 * 3600))
+RECENT_PRICES_TTL = float(os.environ.get('RECENT_PRICES_TTL', 300))
+STOCK_CACHE_DIR = os.environ.get('STOCK_CACHE_DIR', os.path.join(os.getcwd(), 'data', 'cache'))
+STOCK_CACHE_MAX_REFRESHES = int(os.environ.get('STOCK_CACHE_MAX_REFRESHES', 4))
+STOCK_CACHE_SIZE = int(os.environ.get('STOCK_CACHE_SIZE', 512))
+
+info_cache = StaleWhileRevalidateCache(STOCK_INFO_TTL, os.path.join(STOCK_CACHE_DIR, 'info_acoes.json'),
+                                       STOCK_CACHE_MAX_REFRESHES, STOCK_CACHE_SIZE)
+recent_prices_cache = StaleWhileRevalidateCache(RECENT_PRICES_TTL,
+                                                os.path.join(STOCK_CACHE_DIR, 'precos_recentes.json'),
+                                                STOCK_CACHE_MAX_REFRESHES, STOCK_CACHE_SIZE)
+
+def _fetch_info(ticker):
+    """Obter os dados cadastrais do relatório pelo cliente HTTP compartilhado (yfinance com PRICE_PROVIDER=yfinance)"""
+    if PRICE_PROVIDER == 'yfinance':
+        info = timed_import('yfinance').Ticker(ticker).info
+        return {key: info.get(key) for key in
+                ('longName', 'sector', 'industry', 'marketCap', 'averageVolume3months')}
+    return timed_import('cliente_mercado').market_data_client.fetch_info(ticker)
+
+def _fetch_recent_prices(ticker):
+    """Obter os 5 últimos pregões do armazenamento local, em formato serializável"""
+    dados = price_store.get_history(ticker, datetime.now() - timedelta(days=14)).tail(5)
+    return {
+        'index': [d.strftime('%Y-%m-%d') for d in dados.index],
+        'columns': list(dados.columns),
+        'data': dados.values.tolist()
+    }
 
 def get_stock_info(ticker):
     """Obter informações detalhadas da ação"""
     try:
-        # Criar objeto Ticker
-        stock = yf.Ticker(ticker)
-        
-        # Obter dados recentes
-        dados_recentes = stock.history(period='5d')
+        # Obter os 5 últimos pregões
+        recentes = recent_prices_cache.get(ticker, lambda: _fetch_recent_prices(ticker))
+        dados_recentes = pd.DataFrame(recentes['data'], columns=recentes['columns'],
+                                      index=pd.to_datetime(recentes['index']))
         
         if dados_recentes.empty:
             raise ValueError("Não foi possível obter dados")
@@ -20,7 +52,7 @@ def get_stock_info(ticker):
         data_ultimo_preco = dados_recentes.index[-1]
         
         # Obter informações adicionais
-        info = stock.info
+        info = info_cache.get(ticker, lambda: _fetch_info(ticker))
         
         # Criar dicionário com informações relevantes
         stock_info = {
@@ -36,11 +68,11 @@ def get_stock_info(ticker):
         # Adicionar informações do Yahoo Finance (se disponíveis)
         try:
             stock_info.update({
-                'Nome Empresa': info.get('longName', 'N/A'),
-                'Setor': info.get('sector', 'N/A'),
-                'Indústria': info.get('industry', 'N/A'),
-                'Market Cap': f"${info.get('marketCap', 0):,.2f}",
-                'Volume Médio (3m)': f"{info.get('averageVolume3months', 0):,.0f}"
+                'Nome Empresa': info.get('longName') or 'N/A',
+                'Setor': info.get('sector') or 'N/A',
+                'Indústria': info.get('industry') or 'N/A',
+                'Market Cap': f"${info.get('marketCap') or 0:,.2f}",
+                'Volume Médio (3m)': f"{info.get('averageVolume3months') or 0:,.0f}"
             })
         except:
             pass
@@ -51,31 +83,55 @@ def get_stock_info(ticker):
         print(f"Erro ao obter informações da ação: {e}")
         return None, None
 
-def plot_recent_prices(dados_recentes, titulo):
-    """Plotar gráfico dos preços recentes"""
-    plt.figure(figsize=(12, 6))
+def draw_recent_prices(fig, dados_recentes, titulo):
+    """Desenhar o gráfico dos preços recentes na figura informada"""
+    ax = fig.add_subplot(1, 1, 1)
     
     # Plotar preços
-    plt.plot(dados_recentes.index, dados_recentes['Close'], 
+    ax.plot(dados_recentes.index, dados_recentes['Close'], 
             label='Preço de Fechamento', color='blue')
     
     # Destacar último preço
-    plt.scatter(dados_recentes.index[-1], dados_recentes['Close'].iloc[-1],
+    ax.scatter(dados_recentes.index[-1], dados_recentes['Close'].iloc[-1],
                color='red', s=100, label='Último Preço')
     
     # Configurar gráfico
-    plt.title(titulo, fontsize=14)
-    plt.xlabel('Data', fontsize=12)
-    plt.ylabel('Preço ($)', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend()
+    ax.set_title(titulo, fontsize=14)
+    ax.set_xlabel('Data', fontsize=12)
+    ax.set_ylabel('Preço ($)', fontsize=12)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend()
     
     # Rotacionar datas
-    plt.xticks(rotation=45)
+    ax.tick_params(axis='x', rotation=45)
     
-    plt.tight_layout()
+    fig.tight_layout()
+    return fig
+
+def plot_recent_prices(dados_recentes, titulo):
+    """Plotar gráfico dos preços recentes (pyplot, para uso no terminal)"""
+    import matplotlib.pyplot as plt
+    draw_recent_prices(plt.figure(figsize=(12, 6)), dados_recentes, titulo)
     return plt
 
+def recent_prices_title(stock_info, ticker):
+    return f"Preços Recentes - {stock_info['Nome Empresa']} ({ticker})"
+
+def render_recent_prices_chart(stock_info, dados_recentes, ticker):
+    """Retornar (ETag, PNG) do gráfico de preços recentes"""
+    titulo = recent_prices_title(stock_info, ticker)
+    key = chart_key('precos_recentes', titulo, dados_recentes.index.values.tobytes(),
+                    dados_recentes['Close'].to_numpy().tobytes())
+    return key, chart_service.render(key, lambda fig: draw_recent_prices(fig, dados_recentes, titulo))
+
+def recent_prices_series(stock_info, dados_recentes, ticker):
+    """Série de preços recentes em JSON, para o front end desenhar o gráfico"""
+    return {
+        'title': recent_prices_title(stock_info, ticker),
+        'dates': [d.strftime('%Y-%m-%d') for d in dados_recentes.index],
+        'close': [float(v) for v in dados_recentes['Close']]
+    }
+
 def save_report(stock_info, filename='relatorio_acao.txt'):
     """Salvar relatório em arquivo texto"""
     with open(filename, 'w') as f:
@@ -0,0 +1,115 @@
+import os
+import threading
+import numpy as np
+from motor_numpy import extract_weights, lstm_step, dense_head
+
+# Ativa o avanço incremental do estado do LSTM na API (aproximação; ver IncrementalPredictor)
+INCREMENTAL_INFERENCE = os.environ.get('INCREMENTAL_INFERENCE', '0') == '1'
+
+# Número máximo de avanços de uma barra antes de forçar a reexecução da janela completa
+INCREMENTAL_MAX_STEPS = int(os.environ.get('INCREMENTAL_MAX_STEPS', 5))
+
+class TickerState:
+    """Estado das LSTMs de um ticker após a última barra processada"""
+
+    def __init__(self, run_id, data_min, data_max, last_date, last_close, states, output):
+        self.run_id = run_id
+        self.data_min = data_min
+        self.data_max = data_max
+        self.last_date = last_date
+        self.last_close = last_close
+        self.states = states
+        self.output = output
+        self.incremental_steps = 0
+
+class IncrementalPredictor:
+    """Previsão que avança o estado das LSTMs uma barra por vez
+
+    O modelo foi treinado em janelas fixas de 60 barras normalizadas pelo
+    mínimo/máximo da própria janela. Avançar o estado em uma barra mantém
+    contexto anterior à janela, então o resultado é uma aproximação da
+    reexecução completa. Por isso a janela inteira é reprocessada quando o
+    modelo muda, quando a normalização muda (mínimo/máximo da janela), quando
+    a barra anterior foi revisada ou falta alguma barra, e a cada
+    `max_incremental_steps` avanços.
+    """
+
+    def __init__(self, max_incremental_steps=INCREMENTAL_MAX_STEPS):
+        self.max_incremental_steps = max_incremental_steps
+        # Pesos extraídos por run_id (cada ticker pode ser servido por um modelo diferente)
+        self._weights = {}
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _get_weights(self, run_id, model):
+        with self._lock:
+            weights = self._weights.get(run_id)
+            if weights is None:
+                weights = self._weights[run_id] = extract_weights(model)
+            return weights
+
+    def _evict_weights(self, run_id):
+        """Descartar os pesos de runs que não servem mais nenhum ticker (chamado com a trava)"""
+        em_uso = {state.run_id for state in self._states.values()} | {run_id}
+        for antigo in [r for r in self._weights if r not in em_uso]:
+            del self._weights[antigo]
+
+    def _replay(self, scaled_window, lstm_layers):
+        """Processar a janela completa a partir do estado zero"""
+        states = [(np.zeros((1, rk.shape[0]), dtype='float32'),
+                   np.zeros((1, rk.shape[0]), dtype='float32')) for _, rk, _ in lstm_layers]
+        for value in scaled_window:
+            states = self._advance(states, value, lstm_layers)
+        return states
+
+    def _advance(self, states, value, lstm_layers):
+        """Avançar todas as camadas LSTM por uma barra"""
+        x = np.array([[value]], dtype='float32')
+        new_states = []
+        for (h, c), weights in zip(states, lstm_layers):
+            h, c = lstm_step(x, h, c, *weights)
+            new_states.append((h, c))
+            x = h
+        return new_states
+
+    def predict(self, ticker, run_id, model, dados, sequence_length=60):
+        """Retornar o horizonte previsto (em preço) para o ticker"""
+        lstm_layers, dense_layers = self._get_weights(run_id, model)
+
+        closes = dados['Close'].values[-sequence_length:].astype('float64')
+        dates = dados.index[-sequence_length:]
+        data_min, data_max = float(closes.min()), float(closes.max())
+        scale = (data_max - data_min) or 1.0
+        scaled = ((closes - data_min) / scale).astype('float32')
+
+        with self._lock:
+            state = self._states.get(ticker)
+
+            same_params = (state is not None and state.run_id == run_id and
+                           state.data_min == data_min and state.data_max == data_max)
+
+            if same_params and state.last_date == dates[-1] and state.last_close == closes[-1]:
+                # Nenhuma barra nova: reutilizar a saída já calculada
+                output = state.output
+            elif (same_params and len(dates) > 1 and state.last_date == dates[-2] and
+                    state.last_close == closes[-2] and
+                    state.incremental_steps < self.max_incremental_steps):
+                # Uma barra nova: avançar o estado um passo
+                states = self._advance(state.states, scaled[-1], lstm_layers)
+                output = dense_head(states[-1][0], dense_layers)
+                steps = state.incremental_steps + 1
+                state = TickerState(run_id, data_min, data_max, dates[-1], closes[-1], states, output)
+                state.incremental_steps = steps
+                self._states[ticker] = state
+            else:
+                # Modelo, normalização ou dados mudaram: reprocessar a janela completa
+                states = self._replay(scaled, lstm_layers)
+                output = dense_head(states[-1][0], dense_layers)
+                self._states[ticker] = TickerState(run_id, data_min, data_max, dates[-1],
+                                                   closes[-1], states, output)
+                self._evict_weights(run_id)
+
+        return output.ravel().astype('float64') * scale + data_min
+
+# Instância por processo
+incremental_predictor = IncrementalPredictor()
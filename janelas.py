@@ -0,0 +1,23 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def create_windows(data, window=60, horizon=1, stride=1, target_column=0):
+    """Criar janelas deslizantes (X, y) como views do array original, sem cópia
+
+    data: array (amostras,) ou (amostras, features)
+    Retorna X com formato (n, window, features) e y com formato (n, horizon),
+    onde y[i] são os `horizon` valores de `target_column` após a janela X[i].
+    """
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:, np.newaxis]
+
+    n = (len(data) - window - horizon) // stride + 1
+    if n <= 0:
+        return (np.empty((0, window, data.shape[1]), dtype=data.dtype),
+                np.empty((0, horizon), dtype=data.dtype))
+
+    # (amostras - window + 1, features, window) -> (n, window, features)
+    X = sliding_window_view(data, window, axis=0).swapaxes(1, 2)[:n * stride:stride][:n]
+    y = sliding_window_view(data[window:, target_column], horizon)[:n * stride:stride][:n]
+    return X, y
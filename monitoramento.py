@@ -3,10 +3,16 @@ import psutil
 import logging
 from functools import wraps
 from datetime import datetime
-import pandas as pd
 import os
+import io
+import csv
+import fcntl
+import atexit
+import threading
+from collections import deque
 import numpy as np
-from prometheus_client import Counter, Histogram, Gauge, start_http_server
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, REGISTRY, multiprocess, start_http_server
+from estatisticas import LogHistogram, RunningStats, SlidingWindowStats
 
 # Configurar logging
 logging.basicConfig(
@@ -19,70 +25,215 @@ logging.basicConfig(
 PREDICTION_LATENCY = Histogram('prediction_latency_seconds', 'Time spent processing prediction')
 PREDICTION_COUNTER = Counter('prediction_total', 'Total number of predictions')
 PREDICTION_ERROR_COUNTER = Counter('prediction_errors_total', 'Total number of prediction errors')
-MODEL_ACCURACY = Gauge('model_accuracy', 'Current model accuracy')
-MEMORY_USAGE = Gauge('memory_usage_bytes', 'Current memory usage')
-CPU_USAGE = Gauge('cpu_usage_percent', 'Current CPU usage')
+# Em modo multiprocesso (gunicorn), os gauges indicam como combinar os valores dos workers
+MODEL_ACCURACY = Gauge('model_accuracy', 'Current model accuracy', multiprocess_mode='mostrecent')
+MEMORY_USAGE = Gauge('memory_usage_bytes', 'Current memory usage', multiprocess_mode='livesum')
+CPU_USAGE = Gauge('cpu_usage_percent', 'Current CPU usage', multiprocess_mode='livemostrecent')
+MODEL_LOAD_TIME = Histogram('model_load_seconds', 'Time spent loading the model from MLflow')
+MODEL_CACHE_HITS = Counter('model_cache_hits_total', 'Predictions served by the in-memory model')
+MODEL_CACHE_MISSES = Counter('model_cache_misses_total', 'Model loads caused by a missing or newer run')
+RESULT_CACHE_HITS = Counter('prediction_cache_hits_total', 'Predictions answered from the result cache')
+RESULT_CACHE_MISSES = Counter('prediction_cache_misses_total', 'Predictions computed on a result cache miss')
+RESULT_CACHE_COALESCED = Counter('prediction_cache_coalesced_total', 'Predictions that waited on an identical in-flight computation')
+
+# Registros mantidos em memória e configuração do log em disco
+PREDICTION_LOG_BUFFER = int(os.environ.get('PREDICTION_LOG_BUFFER', 10000))
+PREDICTION_LOG_FLUSH_INTERVAL = float(os.environ.get('PREDICTION_LOG_FLUSH_INTERVAL', 5))
+PREDICTION_LOG_MAX_BYTES = int(os.environ.get('PREDICTION_LOG_MAX_BYTES', 10 * 1024 * 1024))
+PREDICTION_LOG_BACKUPS = int(os.environ.get('PREDICTION_LOG_BACKUPS', 5))
+
+# Janelas de tempo das estatísticas do monitor (nome=segundos)
+MONITOR_WINDOWS = {
+    name: float(seconds) for name, seconds in
+    (item.split('=') for item in os.environ.get('MONITOR_WINDOWS', '1m=60,1h=3600,1d=86400').split(','))
+}
+STATS_FIELDS = ('latency', 'memory_usage', 'cpu_usage', 'squared_error')
+
+class RotatingCSVWriter:
+    """Arquivo CSV só de anexação, rotacionado por tamanho (arquivo.1, arquivo.2, ...)"""
+
+    def __init__(self, path, columns, max_bytes=PREDICTION_LOG_MAX_BYTES,
+                 backup_count=PREDICTION_LOG_BACKUPS):
+        self.path = path
+        self.columns = columns
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, records):
+        """Anexar um lote de registros; a trava permite vários workers no mesmo arquivo"""
+        if not records:
+            return
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.columns, extrasaction='ignore')
+        for record in records:
+            writer.writerow(record)
+
+        with open(self.path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    self._rotate()
+                new_file = not os.path.exists(self.path)
+                with open(self.path, 'a', newline='') as f:
+                    if new_file:
+                        f.write(','.join(self.columns) + '\n')
+                    f.write(buffer.getvalue())
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 class ModelMonitor:
-    def __init__(self):
-        self.predictions_log = []
-        self.performance_metrics = []
+    def __init__(self, buffer_size=PREDICTION_LOG_BUFFER, flush_interval=PREDICTION_LOG_FLUSH_INTERVAL,
+                 log_path='prediction_logs.csv', metrics_path='performance_metrics.csv'):
+        # Buffers circulares: apenas os registros mais recentes ficam em memória
+        self.predictions_log = deque(maxlen=buffer_size)
+        self.performance_metrics = deque(maxlen=buffer_size)
+        self.flush_interval = flush_interval
+        
+        # Registros ainda não gravados em disco, por arquivo
+        self._writers = {
+            'predictions': RotatingCSVWriter(log_path, ['timestamp', 'prediction', 'actual_value',
+                                                        'latency', 'memory_usage', 'cpu_usage']),
+            'metrics': RotatingCSVWriter(metrics_path, ['timestamp', 'avg_latency', 'max_latency',
+                                                        'p50_latency', 'p95_latency', 'p99_latency',
+                                                        'avg_memory_usage', 'avg_cpu_usage',
+                                                        'total_predictions', 'mse', 'rmse'])
+        }
+        self._pending = {name: deque() for name in self._writers}
+        
+        # Acumuladores incrementais: totais desde o início e por janela de tempo
+        self._latency_histogram = LogHistogram()
+        self._stats_lock = threading.Lock()
+        self._totals = {name: RunningStats(self._latency_histogram if name == 'latency' else None)
+                        for name in STATS_FIELDS}
+        self._windows = {
+            window: {name: SlidingWindowStats(seconds, histogram=self._latency_histogram
+                                              if name == 'latency' else None)
+                     for name in STATS_FIELDS}
+            for window, seconds in MONITOR_WINDOWS.items()
+        }
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        
+    def _ensure_flusher(self):
+        """Iniciar a thread de gravação no primeiro uso (após o fork dos workers)"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Erro ao gravar logs do monitor: {str(e)}")
+    
+    def flush(self):
+        """Gravar em lote os registros pendentes"""
+        for name, writer in self._writers.items():
+            pending = self._pending[name]
+            records = []
+            while pending:
+                records.append(pending.popleft())
+            writer.write(records)
         
     def log_prediction(self, prediction_data):
         """Registra dados de uma previsão"""
         timestamp = datetime.now()
-        self.predictions_log.append({
+        record = {
             'timestamp': timestamp,
             'prediction': prediction_data['prediction'],
             'actual_value': prediction_data.get('actual_value'),
             'latency': prediction_data['latency'],
             'memory_usage': prediction_data['memory_usage'],
             'cpu_usage': prediction_data['cpu_usage']
-        })
+        }
+        self.predictions_log.append(record)
+        self._observe(record)
         
         # Atualizar métricas Prometheus
         PREDICTION_COUNTER.inc()
+        PREDICTION_LATENCY.observe(prediction_data['latency'])
         MEMORY_USAGE.set(prediction_data['memory_usage'])
         CPU_USAGE.set(prediction_data['cpu_usage'])
         
-        # Salvar logs em CSV
-        self._save_logs()
+        # Gravação em disco feita em lote pela thread de gravação
+        self._pending['predictions'].append(record)
+        self._ensure_flusher()
+        
+    def _observe(self, record):
+        """Atualizar os acumuladores de todas as janelas com uma previsão"""
+        timestamp = record['timestamp'].timestamp()
+        values = {
+            'latency': record['latency'],
+            'memory_usage': record['memory_usage'],
+            'cpu_usage': record['cpu_usage']
+        }
+        if record.get('actual_value') is not None:
+            values['squared_error'] = (record['prediction'] - record['actual_value']) ** 2
         
+        with self._stats_lock:
+            for name, value in values.items():
+                self._totals[name].add(value, self._latency_histogram if name == 'latency' else None)
+        for windows in self._windows.values():
+            for name, value in values.items():
+                windows[name].add(value, timestamp)
+    
     def calculate_metrics(self):
-        """Calcula métricas de performance"""
-        if not self.predictions_log:
+        """Calcula métricas de performance a partir dos acumuladores (custo constante)"""
+        with self._stats_lock:
+            latency = self._totals['latency'].summary(self._latency_histogram)
+            memory = self._totals['memory_usage'].summary()
+            cpu = self._totals['cpu_usage'].summary()
+            squared_error = self._totals['squared_error'].summary()
+        
+        if latency['count'] == 0:
             return {}
-            
-        df = pd.DataFrame(self.predictions_log)
         
         metrics = {
-            'avg_latency': df['latency'].mean(),
-            'max_latency': df['latency'].max(),
-            'avg_memory_usage': df['memory_usage'].mean(),
-            'avg_cpu_usage': df['cpu_usage'].mean(),
-            'total_predictions': len(df),
+            'avg_latency': latency['mean'],
+            'max_latency': latency['max'],
+            'p50_latency': latency['p50'],
+            'p95_latency': latency['p95'],
+            'p99_latency': latency['p99'],
+            'avg_memory_usage': memory['mean'],
+            'avg_cpu_usage': cpu['mean'],
+            'total_predictions': latency['count'],
             'timestamp': datetime.now()
         }
         
         # Calcular acurácia se houver valores reais
-        if 'actual_value' in df.columns and not df['actual_value'].isna().all():
-            mse = ((df['prediction'] - df['actual_value'])**2).mean()
+        if squared_error['count'] > 0:
+            mse = squared_error['mean']
             metrics['mse'] = mse
             metrics['rmse'] = np.sqrt(mse)
             
             # Atualizar métrica de acurácia no Prometheus
             MODEL_ACCURACY.set(1 - mse)
+        
+        # Estatísticas por janela de tempo deslizante
+        metrics['windows'] = {
+            window: {name: stats.summary() for name, stats in windows.items()}
+            for window, windows in self._windows.items()
+        }
             
         self.performance_metrics.append(metrics)
+        self._pending['metrics'].append(metrics)
+        self._ensure_flusher()
         return metrics
-    
-    def _save_logs(self):
-        """Salva logs em arquivo CSV"""
-        df = pd.DataFrame(self.predictions_log)
-        df.to_csv('prediction_logs.csv', index=False)
-        
-        metrics_df = pd.DataFrame(self.performance_metrics)
-        metrics_df.to_csv('performance_metrics.csv', index=False)
 
 # Criar instância global do monitor
 model_monitor = ModelMonitor()
@@ -110,7 +261,6 @@ def monitor_prediction(func):
             
             # Registrar métricas
             model_monitor.log_prediction(prediction_data)
-            PREDICTION_LATENCY.observe(latency)
             
             return result
             
@@ -121,9 +271,17 @@ def monitor_prediction(func):
             
     return wrapper
 
+def create_metrics_registry():
+    """Registro que agrega as métricas de todos os workers, se em modo multiprocesso"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
 def start_monitoring_server(port=8000):
     """Inicia servidor Prometheus"""
-    start_http_server(port)
+    start_http_server(port, registry=create_metrics_registry())
     logging.info(f"Servidor de monitoramento iniciado na porta {port}")
 
 def get_resource_usage():
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import numpy as np
+
+# Motor de inferência usado pela API: 'numpy' (sem TensorFlow) ou 'keras'
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'numpy')
+
+# Caminho do artefato de pesos dentro do run do MLflow
+NUMPY_ARTIFACT_PATH = 'modelo_numpy'
+NUMPY_ARTIFACT_FILE = 'modelo_lstm.npz'
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid
+}
+
+def extract_weights(model):
+    """Extrair pesos das camadas LSTM e Dense de um modelo Keras (ou NumPy)"""
+    if isinstance(model, NumpyLSTMModel):
+        return model.lstm_layers, model.dense_layers
+
+    lstm_layers, dense_layers = [], []
+    for layer in model.layers:
+        name = type(layer).__name__
+        if name == 'LSTM':
+            kernel, recurrent_kernel, bias = layer.get_weights()
+            lstm_layers.append((kernel.astype('float32'), recurrent_kernel.astype('float32'),
+                                bias.astype('float32')))
+        elif name == 'Dense':
+            kernel, bias = layer.get_weights()
+            activation = layer.get_config().get('activation', 'linear')
+            dense_layers.append((kernel.astype('float32'), bias.astype('float32'), activation))
+    return lstm_layers, dense_layers
+
+def lstm_step(x, h, c, kernel, recurrent_kernel, bias):
+    """Avançar uma célula LSTM (ordem de portas do Keras: i, f, c, o) por um passo"""
+    return _lstm_gates(x @ kernel + bias, h, c, recurrent_kernel)
+
+def _lstm_gates(projected_input, h, c, recurrent_kernel):
+    """Aplicar as portas da LSTM dada a projeção da entrada (x @ W + b)"""
+    units = h.shape[-1]
+    z = projected_input + h @ recurrent_kernel
+    i = _sigmoid(z[..., :units])
+    f = _sigmoid(z[..., units:2 * units])
+    g = np.tanh(z[..., 2 * units:3 * units])
+    o = _sigmoid(z[..., 3 * units:])
+    c = f * c + i * g
+    h = o * np.tanh(c)
+    return h, c
+
+def dense_head(h, dense_layers):
+    """Aplicar as camadas densas finais ao estado oculto da última LSTM"""
+    for kernel, bias, activation in dense_layers:
+        h = _ACTIVATIONS[activation](h @ kernel + bias)
+    return h
+
+class NumpyLSTMModel:
+    """Forward pass de LSTMs empilhadas + camadas densas em NumPy puro
+
+    Tem a mesma interface de `predict` do Keras, então pode substituir o
+    modelo carregado pelo MLflow sem importar o TensorFlow.
+    """
+
+    def __init__(self, lstm_layers, dense_layers):
+        self.lstm_layers = lstm_layers
+        self.dense_layers = dense_layers
+
+    @classmethod
+    def load(cls, path):
+        """Carregar pesos exportados por `export_weights`"""
+        with np.load(path) as data:
+            lstm_layers = [(data[f'lstm_{i}_kernel'], data[f'lstm_{i}_recurrent_kernel'],
+                            data[f'lstm_{i}_bias']) for i in range(int(data['n_lstm']))]
+            dense_layers = [(data[f'dense_{i}_kernel'], data[f'dense_{i}_bias'],
+                             str(data['dense_activations'][i])) for i in range(int(data['n_dense']))]
+        return cls(lstm_layers, dense_layers)
+
+    def predict(self, X, verbose=0, batch_size=None):
+        """Prever para um lote de janelas com formato (N, passos, features)"""
+        sequence = np.asarray(X, dtype='float32')
+        batch = sequence.shape[0]
+
+        for kernel, recurrent_kernel, bias in self.lstm_layers:
+            units = recurrent_kernel.shape[0]
+            # Projeção da entrada de todos os passos em uma única multiplicação
+            projected = sequence @ kernel + bias
+            h = np.zeros((batch, units), dtype='float32')
+            c = np.zeros((batch, units), dtype='float32')
+            outputs = np.empty((batch, sequence.shape[1], units), dtype='float32')
+            for t in range(sequence.shape[1]):
+                h, c = _lstm_gates(projected[:, t], h, c, recurrent_kernel)
+                outputs[:, t] = h
+            sequence = outputs
+
+        return dense_head(sequence[:, -1], self.dense_layers)
+
+def export_weights(model, path):
+    """Exportar os pesos de um modelo Keras para um arquivo .npz compacto"""
+    lstm_layers, dense_layers = extract_weights(model)
+    arrays = {'n_lstm': len(lstm_layers), 'n_dense': len(dense_layers),
+              'dense_activations': np.array([activation for _, _, activation in dense_layers])}
+    for i, (kernel, recurrent_kernel, bias) in enumerate(lstm_layers):
+        arrays[f'lstm_{i}_kernel'] = kernel
+        arrays[f'lstm_{i}_recurrent_kernel'] = recurrent_kernel
+        arrays[f'lstm_{i}_bias'] = bias
+    for i, (kernel, bias, _) in enumerate(dense_layers):
+        arrays[f'dense_{i}_kernel'] = kernel
+        arrays[f'dense_{i}_bias'] = bias
+    np.savez_compressed(path, **arrays)
+    return path
+
+def load_from_run(run_id):
+    """Baixar (ou localizar) o artefato .npz do run e carregar o motor NumPy"""
+    from perfil_inicializacao import timed_import
+    path = timed_import('mlflow.artifacts').download_artifacts(
+        run_id=run_id, artifact_path=f"{NUMPY_ARTIFACT_PATH}/{NUMPY_ARTIFACT_FILE}")
+    return NumpyLSTMModel.load(path)
+
+def check_parity(keras_model, numpy_model, samples=256, sequence_length=60, seed=0):
+    """Comparar saídas e tempos do Keras e do motor NumPy em janelas aleatórias"""
+    X = np.random.default_rng(seed).random((samples, sequence_length, 1), dtype='float32')
+
+    keras_output = keras_model.predict(X, verbose=0)
+    numpy_output = numpy_model.predict(X)
+
+    single = X[:1]
+    keras_model.predict(single, verbose=0)
+    start_time = time.perf_counter()
+    for _ in range(20):
+        keras_model.predict(single, verbose=0)
+    keras_time = (time.perf_counter() - start_time) / 20
+
+    start_time = time.perf_counter()
+    for _ in range(20):
+        numpy_model.predict(single)
+    numpy_time = (time.perf_counter() - start_time) / 20
+
+    return {
+        'max_abs_diff': float(np.max(np.abs(keras_output - numpy_output))),
+        'keras_single_ms': keras_time * 1000,
+        'numpy_single_ms': numpy_time * 1000
+    }
+
+if __name__ == "__main__":
+    # Uso: python motor_numpy.py <run_id>  (verifica a paridade com o modelo Keras do run)
+    import mlflow
+    import mlflow.keras
+    mlflow.set_tracking_uri('file:' + os.path.join(os.getcwd(), 'mlruns'))
+    run_id = sys.argv[1]
+    resultado = check_parity(mlflow.keras.load_model(f"runs:/{run_id}/modelo_lstm"), load_from_run(run_id))
+    print(f"Diferença máxima absoluta: {resultado['max_abs_diff']:.2e}")
+    print(f"Keras (1 janela): {resultado['keras_single_ms']:.2f} ms")
+    print(f"NumPy (1 janela): {resultado['numpy_single_ms']:.2f} ms")
+    sys.exit(0 if resultado['max_abs_diff'] < 1e-4 else 1)
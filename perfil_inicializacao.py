@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import importlib
+import subprocess
+import psutil
+from prometheus_client import Gauge
+
+# Métricas de inicialização (por processo; no gunicorn vale o maior valor entre workers)
+STARTUP_IMPORT_SECONDS = Gauge('startup_import_seconds', 'Time spent importing a module on first use',
+                               ['module'], multiprocess_mode='max')
+STARTUP_TIME_TO_HEALTHY = Gauge('startup_time_to_healthy_seconds',
+                                'Time from process start to the first healthy /health response',
+                                multiprocess_mode='max')
+
+# Tempos de import registrados neste processo
+import_times = {}
+_healthy = {'at': None}
+
+def record_import(module, seconds):
+    import_times[module] = seconds
+    STARTUP_IMPORT_SECONDS.labels(module=module).set(seconds)
+
+def timed_import(name):
+    """Importar um módulo pesado sob demanda, registrando o tempo do primeiro import"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start_time = time.perf_counter()
+    module = importlib.import_module(name)
+    record_import(name, time.perf_counter() - start_time)
+    return module
+
+def mark_healthy():
+    """Registrar, uma única vez, o tempo desde o início do processo até a primeira resposta saudável"""
+    if _healthy['at'] is None:
+        _healthy['at'] = time.time() - psutil.Process().create_time()
+        STARTUP_TIME_TO_HEALTHY.set(_healthy['at'])
+    return _healthy['at']
+
+def _parse_importtime(stderr, max_depth=1):
+    """Extrair o tempo cumulativo (s) por módulo da saída de -X importtime, até `max_depth` níveis"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split(':', 1)[1].split('|')
+        # Cada nível de import aninhado acrescenta dois espaços antes do nome
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= max_depth:
+            times[name.strip()] = int(cumulative_us) / 1e6
+    return times
+
+def profile_startup(module='app', top=20):
+    """Medir o import de `module` em um processo novo e o tempo até o primeiro /health saudável"""
+    script = (
+        "import time; start = time.perf_counter()\n"
+        f"import {module}\n"
+        "imported = time.perf_counter()\n"
+        f"client = {module}.app.test_client()\n"
+        f"{module}.run_warm_up()\n"
+        "status = client.get('/health').status_code\n"
+        "print(f'{imported - start:.4f} {time.perf_counter() - start:.4f} {status}')\n"
+    )
+    # Processo novo, com o diretório do projeto no path e o diretório atual preservado (mlruns)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    import_seconds, healthy_seconds, status = result.stdout.strip().splitlines()[-1].split()
+    times = _parse_importtime(result.stderr)
+
+    print(f"\nPerfil de inicialização de '{module}'")
+    print("=" * 50)
+    print(f"Import de {module}: {float(import_seconds):.2f}s")
+    print(f"Até o primeiro /health (HTTP {status}): {float(healthy_seconds):.2f}s")
+    print(f"\nMódulos de primeiro nível mais lentos:")
+    for name, seconds in sorted(times.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{name:40} {seconds:8.3f}s")
+    return {'import': float(import_seconds), 'healthy': float(healthy_seconds), 'modules': times}
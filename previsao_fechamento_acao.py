@@ -1,17 +1,44 @@
-import mlflow
-import yfinance as yf
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
 import os
+from functools import lru_cache
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from cache_modelo import model_cache, get_mlflow
+from perfil_inicializacao import timed_import
+from registro_modelos import get_latest_run, get_run, get_served_runs
+from armazenamento_precos import price_store, validate_ticker
+from cache_resultados import result_cache
+from servico_graficos import chart_service, chart_key
+from inferencia_incremental import incremental_predictor, INCREMENTAL_INFERENCE
+from armazenamento_janelas import window_store, WINDOW_STORE_ENABLED
 
-def get_latest_model():
-    """Encontrar o modelo mais recente no MLflow"""
-    mlflow.set_tracking_uri('file:' + os.path.join(os.getcwd(), 'mlruns'))
-    client = mlflow.tracking.MlflowClient()
+def get_latest_model(ticker=None):
+    """Encontrar o modelo mais recente do ticker, consultando primeiro o índice local
+
+    Um ticker sem modelo próprio é servido pelo modelo mais recente em geral.
+    """
+    ticker = validate_ticker(ticker) if ticker else None
+    entry = get_latest_run(ticker)
+    if entry is None and ticker:
+        entry = get_latest_run()
+    if entry is not None:
+        return entry['run_id']
+
+    # Índice ausente ou desatualizado: varrer os experimentos do MLflow
+    client = get_mlflow().tracking.MlflowClient()
+    
+    latest_run = _scan_latest_run(client, f"params.ticker = '{ticker}'") if ticker else None
+    if latest_run is None:
+        latest_run = _scan_latest_run(client, "")
     
+    if latest_run is None:
+        raise Exception("Nenhum modelo encontrado")
+        
+    return latest_run.info.run_id
+
+def _scan_latest_run(client, filter_string):
+    """Run mais recente, entre todos os experimentos, que satisfaz o filtro"""
     # Listar todos os experimentos
     experiments = client.search_experiments()
     latest_run = None
@@ -21,30 +48,53 @@ def get_latest_model():
         # Buscar as runs do experimento
         runs = client.search_runs(
             experiment_ids=[experiment.experiment_id],
-            filter_string="",
+            filter_string=filter_string,
             order_by=["start_time DESC"],
-            max_results=1
+            max_results=100
         )
         
-        if runs and runs[0].info.start_time > latest_timestamp:
-            latest_timestamp = runs[0].info.start_time
-            latest_run = runs[0]
+        for run in runs:
+            if run.info.start_time <= latest_timestamp:
+                break
+            # Runs sem modelo (busca de hiperparâmetros e seus trials) não servem previsões
+            if any(a.path == 'modelo_lstm' for a in client.list_artifacts(run.info.run_id)):
+                latest_timestamp = run.info.start_time
+                latest_run = run
+                break
     
-    if latest_run is None:
-        raise Exception("Nenhum modelo encontrado")
-        
-    return latest_run.info.run_id
+    return latest_run
+
+@lru_cache(maxsize=None)
+def model_window(run_id):
+    """Tamanho da janela de entrada com que o modelo do run foi treinado"""
+    entry = get_run(run_id)
+    if entry is not None:
+        params = entry['params']
+    else:
+        params = get_mlflow().tracking.MlflowClient().get_run(run_id).data.params
+    # Runs anteriores ao parâmetro foram treinados com a janela fixa de 60 dias
+    return int(params.get('window', 60))
 
-def prepare_data_for_prediction(ticker, sequence_length=60):
+def _resolve_window(run_id, sequence_length):
+    """Janela do modelo; recusar um tamanho pedido diferente daquele com que foi treinado"""
+    window = model_window(run_id)
+    if sequence_length is not None and sequence_length != window:
+        raise ValueError(f"O modelo do run_id {run_id} usa janelas de {window} dias, "
+                         f"não de {sequence_length}")
+    return window
+
+def load_recent_prices(ticker, sequence_length=60):
+    """Obter os dados históricos recentes do armazenamento local"""
+    end_date = datetime.now()
+    # Margem para fins de semana e feriados
+    start_date = end_date - timedelta(days=sequence_length * 2 + 30)
+    return price_store.get_history(ticker, start_date)
+
+def prepare_data_for_prediction(ticker, sequence_length=60, dados=None):
     """Preparar dados para previsão"""
     try:
-        # Baixar dados históricos
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=sequence_length + 30)
-        
-        # Configurar ticker
-        ticker_obj = yf.Ticker(ticker)
-        dados = ticker_obj.history(start=start_date, end=end_date)
+        if dados is None:
+            dados = load_recent_prices(ticker, sequence_length)
         
         if len(dados) < sequence_length:
             raise ValueError(f"Dados insuficientes. Necessário {sequence_length} dias.")
@@ -53,7 +103,7 @@ def prepare_data_for_prediction(ticker, sequence_length=60):
         close_prices = dados['Close'].values[-sequence_length:].reshape(-1, 1)
         
         # Normalizar dados
-        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaler = timed_import('sklearn.preprocessing').MinMaxScaler(feature_range=(0, 1))
         scaled_data = scaler.fit_transform(close_prices)
         
         # Preparar input para o modelo
@@ -65,80 +115,194 @@ def prepare_data_for_prediction(ticker, sequence_length=60):
         print(f"Erro ao preparar dados: {e}")
         raise
 
-def make_prediction():
+# Resultados em cache do ticker deixam de valer quando um novo modelo é carregado para ele
+model_cache.on_swap(lambda ticker, run_id: result_cache.invalidate(
+    None if ticker is None else lambda key: key[0] == ticker))
+
+# Número máximo de tickers preparados em paralelo na previsão em lote
+BATCH_PREPARE_WORKERS = int(os.environ.get('BATCH_PREPARE_WORKERS', 16))
+
+def load_window(ticker, sequence_length=60):
+    """Janela normalizada mais recente: lida do armazenamento pré-calculado ou preparada na hora"""
+    # O avanço incremental precisa do histórico de preços, não só da janela
+    if WINDOW_STORE_ENABLED and not INCREMENTAL_INFERENCE:
+        janela = window_store.get(ticker, sequence_length)
+        if janela is not None:
+            janela['dados'] = None
+            return janela
+
+    dados = load_recent_prices(ticker, sequence_length)
+    if len(dados) == 0:
+        raise ValueError(f"Nenhum dado encontrado para {ticker}")
+    X, scaler, dados = prepare_data_for_prediction(ticker, sequence_length, dados)
+    return {
+        'X': X,
+        'data_min': float(scaler.data_min_[0]),
+        'data_range': float(1 / scaler.scale_[0]),
+        'date': dados.index[-1],
+        'last_close': float(dados['Close'].iloc[-1]),
+        'dados': dados
+    }
+
+def compute_prediction(ticker='AMBA', sequence_length=None):
+    """Calcular a previsão do próximo fechamento, sem gerar gráficos"""
+    # Obter o modelo mais recente do ticker (mantido em memória entre previsões)
+    ticker = ticker.upper()
+    run_id, model = model_cache.get_model(ticker)
+    sequence_length = _resolve_window(run_id, sequence_length)
+    
+    # A previsão só muda com uma nova barra (ou revisão da barra do dia) ou novo modelo
+    janela = load_window(ticker, sequence_length)
+    key = (ticker, sequence_length, janela['date'], janela['last_close'], run_id)
+    
+    return result_cache.get_or_compute(
+        key, lambda: _predict(ticker, run_id, model, janela, sequence_length))
+
+def _predict(ticker, run_id, model, janela, sequence_length):
+    """Executar o modelo sobre a janela mais recente"""
+    # Fazer previsão (todo o horizonte do modelo em uma única passada)
+    if INCREMENTAL_INFERENCE:
+        horizonte = incremental_predictor.predict(ticker, run_id, model, janela['dados'], sequence_length)
+    else:
+        prediction_scaled = model.predict(janela['X'], verbose=0)
+        horizonte = prediction_scaled.ravel() * janela['data_range'] + janela['data_min']
+    prediction = float(horizonte[0])
+    
+    # Obter último preço conhecido
+    ultimo_preco = janela['last_close']
+    
+    # Calcular variação percentual
+    variacao = ((prediction - ultimo_preco) / ultimo_preco) * 100
+    
+    return {
+        'ticker': ticker,
+        'run_id': run_id,
+        'prediction': prediction,
+        'ultimo_preco': ultimo_preco,
+        'variacao': variacao,
+        'horizonte': [float(p) for p in horizonte],
+        'data': janela['date'],
+        'dados': janela['dados']
+    }
+
+def _with_history(resultado, sequence_length=60):
+    """Incluir o histórico recente (até o pregão da janela) para os gráficos"""
+    if resultado['dados'] is not None:
+        return resultado
+    dados = load_recent_prices(resultado['ticker'], sequence_length)
+    return {**resultado, 'dados': dados[dados.index <= resultado['data']]}
+
+def warm_up():
+    """Carregar os modelos servidos e executar uma inferência de aquecimento em cada run"""
+    run_ids = []
+    for ticker in list(get_served_runs()) or [None]:
+        run_id, model = model_cache.get_model(ticker)
+        if run_id in run_ids:
+            continue
+        model.predict(np.zeros((1, model_window(run_id), 1), dtype='float32'), verbose=0)
+        run_ids.append(run_id)
+    return run_ids
+
+def make_prediction(ticker='AMBA'):
     try:
-        # Configurações
-        ticker = 'AMBA'
-        sequence_length = 60
-        
-        # Obter o modelo mais recente
-        run_id = get_latest_model()
-        print(f"Usando modelo do run_id: {run_id}")
-        
-        # Carregar o modelo
-        model_path = f"runs:/{run_id}/modelo_lstm"
-        model = mlflow.keras.load_model(model_path)
-        
-        # Preparar dados
-        X, scaler, dados = prepare_data_for_prediction(ticker, sequence_length)
-        
-        # Fazer previsão
-        prediction_scaled = model.predict(X, verbose=0)
-        prediction = scaler.inverse_transform(prediction_scaled)[0][0]
-        
-        # Obter último preço conhecido
-        ultimo_preco = float(dados['Close'].iloc[-1])
-        
-        # Calcular variação percentual
-        variacao = ((prediction - ultimo_preco) / ultimo_preco) * 100
-        
-        # Plotar gráfico
-        plt.figure(figsize=(15, 7))
-        
-        # Plotar histórico recente
-        plt.plot(dados.index[-30:], dados['Close'][-30:], 
-                label='Histórico Recente', color='blue')
-        
-        # Plotar previsão
-        proxima_data = dados.index[-1] + timedelta(days=1)
-        plt.scatter(proxima_data, prediction, 
-                   color='red', s=100, label='Previsão')
-        
-        plt.title(f'Previsão de Preço para {ticker}', fontsize=16)
-        plt.xlabel('Data', fontsize=12)
-        plt.ylabel('Preço ($)', fontsize=12)
-        plt.grid(True)
-        plt.legend()
-        
-        # Adicionar informações
-        info_text = (f'Último preço: ${ultimo_preco:.2f}\n'
-                    f'Previsão: ${prediction:.2f}\n'
-                    f'Variação: {variacao:.2f}%')
-        
-        plt.figtext(0.01, 0.01, info_text, fontsize=10, 
-                   bbox=dict(facecolor='white', alpha=0.8))
-        
-        plt.tight_layout()
-        
-        # Salvar gráfico
-        plt.savefig('previsao_atual.png')
-        
-        # Imprimir resultados
-        print("\nResultados da Previsão:")
-        print(f"Data da previsão: {datetime.now().strftime('%Y-%m-%d')}")
-        print(f"Último preço conhecido: ${ultimo_preco:.2f}")
-        print(f"Previsão para próximo dia útil: ${prediction:.2f}")
-        print(f"Variação esperada: {variacao:.2f}%")
-        
-        # Mostrar gráfico
-        plt.show()
-        
-        return prediction, ultimo_preco, variacao
+        resultado = compute_prediction(ticker)
+        return resultado['prediction'], resultado['ultimo_preco'], resultado['variacao']
         
     except Exception as e:
         print(f"Erro ao fazer previsão: {e}")
         return None, None, None
 
+def plot_prediction(resultado, fig):
+    """Desenhar histórico recente e previsão na figura informada"""
+    dados = resultado['dados']
+    prediction = resultado['prediction']
+    ultimo_preco = resultado['ultimo_preco']
+    variacao = resultado['variacao']
+    
+    ax = fig.add_subplot(1, 1, 1)
+    
+    # Plotar histórico recente
+    ax.plot(dados.index[-30:], dados['Close'][-30:], 
+            label='Histórico Recente', color='blue')
+    
+    # Plotar previsão (próximos dias úteis do horizonte)
+    horizonte = resultado['horizonte']
+    proximas_datas = pd.bdate_range(dados.index[-1] + timedelta(days=1), periods=len(horizonte))
+    ax.scatter(proximas_datas, horizonte, 
+               color='red', s=100, label='Previsão')
+    if len(horizonte) > 1:
+        ax.plot(proximas_datas, horizonte, color='red', linestyle='--')
+    
+    ax.set_title(f'Previsão de Preço para {resultado["ticker"]}', fontsize=16)
+    ax.set_xlabel('Data', fontsize=12)
+    ax.set_ylabel('Preço ($)', fontsize=12)
+    ax.grid(True)
+    ax.legend()
+    
+    # Adicionar informações
+    info_text = (f'Último preço: ${ultimo_preco:.2f}\n'
+                f'Previsão: ${prediction:.2f}\n'
+                f'Variação: {variacao:.2f}%')
+    
+    fig.text(0.01, 0.01, info_text, fontsize=10, 
+             bbox=dict(facecolor='white', alpha=0.8))
+    
+    fig.tight_layout()
+    return fig
+
+def render_prediction_chart(ticker='AMBA'):
+    """Retornar (ETag, PNG) da previsão; o gráfico é reutilizado enquanto barra e modelo não mudam"""
+    resultado = compute_prediction(ticker)
+    key = chart_key('previsao', ticker, resultado['data'], resultado['ultimo_preco'], resultado['run_id'])
+    return key, chart_service.render(key, lambda fig: plot_prediction(_with_history(resultado), fig),
+                                     figsize=(15, 7))
+
+def make_batch_prediction(tickers, sequence_length=None):
+    """Fazer previsões para vários tickers com uma chamada por modelo"""
+    def prepare(ticker):
+        try:
+            run_id, model = model_cache.get_model(ticker)
+            janela = load_window(ticker, _resolve_window(run_id, sequence_length))
+            return (run_id, model, janela), None
+        except Exception as e:
+            return None, str(e)
+
+    # Resolver o modelo e preparar as janelas (do tamanho de cada modelo) de todos os tickers em paralelo
+    workers = max(1, min(BATCH_PREPARE_WORKERS, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        preparados = list(executor.map(prepare, tickers))
+
+    resultados = [{'ticker': ticker, 'error': erro} if erro else None
+                  for ticker, (_, erro) in zip(tickers, preparados)]
+
+    # Agrupar os tickers pelo modelo que os serve
+    grupos = {}
+    for i, (preparado, _) in enumerate(preparados):
+        if preparado is not None:
+            grupos.setdefault(preparado[0], []).append(i)
+
+    for run_id, validos in grupos.items():
+        model = preparados[validos[0]][0][1]
+        # Empilhar as janelas em um único tensor (N, janela, 1) para um só predict por modelo
+        X = np.concatenate([preparados[i][0][2]['X'] for i in validos])
+        predictions_scaled = model.predict(X, verbose=0)
+
+        for i, prediction_scaled in zip(validos, predictions_scaled):
+            janela = preparados[i][0][2]
+            horizonte = prediction_scaled.ravel() * janela['data_range'] + janela['data_min']
+            prediction = float(horizonte[0])
+            ultimo_preco = janela['last_close']
+            resultados[i] = {
+                'ticker': tickers[i],
+                'run_id': run_id,
+                'prediction': prediction,
+                'ultimo_preco': ultimo_preco,
+                'variacao': ((prediction - ultimo_preco) / ultimo_preco) * 100,
+                'horizonte': [float(p) for p in horizonte]
+            }
+
+    return resultados
+
 def save_prediction_results(prediction, ultimo_preco, variacao):
     """Salvar resultados da previsão"""
     try:
@@ -166,7 +330,30 @@ def save_prediction_results(prediction, ultimo_preco, variacao):
 if __name__ == "__main__":
     try:
         # Fazer previsão
-        prediction, ultimo_preco, variacao = make_prediction()
+        ticker = 'AMBA'
+        resultado = compute_prediction(ticker)
+        prediction = resultado['prediction']
+        ultimo_preco = resultado['ultimo_preco']
+        variacao = resultado['variacao']
+        print(f"Usando modelo do run_id: {resultado['run_id']}")
+        
+        # Plotar e salvar gráfico
+        import matplotlib.pyplot as plt
+        plot_prediction(_with_history(resultado), plt.figure(figsize=(15, 7)))
+        plt.savefig('previsao_atual.png')
+        
+        # Imprimir resultados
+        print("\nResultados da Previsão:")
+        print(f"Data da previsão: {datetime.now().strftime('%Y-%m-%d')}")
+        print(f"Último preço conhecido: ${ultimo_preco:.2f}")
+        print(f"Previsão para próximo dia útil: ${prediction:.2f}")
+        print(f"Variação esperada: {variacao:.2f}%")
+        if len(resultado['horizonte']) > 1:
+            print("Previsões do horizonte: " +
+                  ", ".join(f"${p:.2f}" for p in resultado['horizonte']))
+        
+        # Mostrar gráfico
+        plt.show()
         
         if all(v is not None for v in [prediction, ultimo_preco, variacao]):
             # Salvar resultados
@@ -0,0 +1,21 @@
+import os
+import multiprocessing
+
+def _init_worker(threads):
+    """Limitar as threads do TensorFlow em cada processo para não disputar núcleos"""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def process_pool_kwargs(n_tasks, max_workers=None, threads_per_worker=None):
+    """Argumentos do ProcessPoolExecutor (spawn) para `n_tasks` tarefas, dividindo os núcleos entre os processos"""
+    cpus = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpus, n_tasks))
+    threads = threads_per_worker or max(1, cpus // max_workers)
+    return {
+        'max_workers': max_workers,
+        'mp_context': multiprocessing.get_context('spawn'),
+        'initializer': _init_worker,
+        'initargs': (threads,)
+    }
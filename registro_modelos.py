@@ -0,0 +1,130 @@
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from urllib.parse import urlparse, unquote
+
+# Índice local dos modelos treinados, atualizado ao final de cada treinamento
+REGISTRY_PATH = os.environ.get('MODEL_REGISTRY_PATH',
+                               os.path.join(os.getcwd(), 'mlruns', 'registro_modelos.json'))
+
+# Cache em memória do índice, recarregado apenas quando o arquivo muda
+_cache = {'mtime': None, 'index': None}
+
+def _empty_index():
+    return {'runs': {}, 'latest': {}, 'best': {}, 'latest_run_id': None}
+
+@contextmanager
+def _locked(path):
+    """Trava exclusiva entre processos para atualizar o índice"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_index(path):
+    with open(path) as f:
+        return json.load(f)
+
+def _write_index(path, index):
+    """Grava o índice de forma atômica (arquivo temporário + rename)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _artifact_exists(artifact_uri):
+    """Verifica se o artefato do modelo ainda existe no tracking store local"""
+    parsed = urlparse(artifact_uri)
+    if parsed.scheme not in ('', 'file'):
+        return True
+    return os.path.exists(unquote(parsed.path))
+
+def load_index(path=REGISTRY_PATH):
+    """Carregar o índice, reutilizando a cópia em memória se o arquivo não mudou"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if _cache['mtime'] != mtime or _cache.get('path') != path:
+        _cache.update({'mtime': mtime, 'path': path, 'index': _read_index(path)})
+    return _cache['index']
+
+def register_run(run_id, ticker, start_time, metrics, artifact_uri, params=None,
+                 best_metric='test_rmse', path=REGISTRY_PATH):
+    """Registrar um run concluído no índice local"""
+    entry = {
+        'run_id': run_id,
+        'ticker': ticker,
+        'start_time': start_time,
+        'metrics': {k: float(v) for k, v in metrics.items()},
+        'params': params or {},
+        'artifact_uri': artifact_uri
+    }
+
+    with _locked(path):
+        index = _read_index(path) if os.path.exists(path) else _empty_index()
+        index['runs'][run_id] = entry
+
+        latest_id = index['latest'].get(ticker)
+        if latest_id is None or index['runs'][latest_id]['start_time'] <= start_time:
+            index['latest'][ticker] = run_id
+
+        overall_id = index.get('latest_run_id')
+        if overall_id is None or index['runs'][overall_id]['start_time'] <= start_time:
+            index['latest_run_id'] = run_id
+
+        best_id = index['best'].get(ticker)
+        score = entry['metrics'].get(best_metric)
+        if score is not None and (
+                best_id is None or
+                score < index['runs'][best_id]['metrics'].get(best_metric, float('inf'))):
+            index['best'][ticker] = run_id
+
+        _write_index(path, index)
+
+    return entry
+
+def _lookup(run_id, index):
+    """Retorna a entrada do run ou None se o índice estiver desatualizado"""
+    if run_id is None:
+        return None
+    entry = index['runs'].get(run_id)
+    if entry is None or not _artifact_exists(entry['artifact_uri']):
+        return None
+    return entry
+
+def get_latest_run(ticker=None, path=REGISTRY_PATH):
+    """Run mais recente (de um ticker ou geral); None se o índice não puder responder"""
+    index = load_index(path)
+    if index is None:
+        return None
+    run_id = index['latest'].get(ticker) if ticker else index.get('latest_run_id')
+    return _lookup(run_id, index)
+
+def get_run(run_id, path=REGISTRY_PATH):
+    """Entrada de um run (com os parâmetros de treino); None se o índice não puder responder"""
+    index = load_index(path)
+    if index is None:
+        return None
+    return _lookup(run_id, index)
+
+def get_served_runs(path=REGISTRY_PATH):
+    """Run servido para cada ticker (chave None: o mais recente em geral); vazio sem índice"""
+    index = load_index(path)
+    if index is None:
+        return {}
+    served = {ticker: index['latest'][ticker] for ticker in index['latest']}
+    served[None] = index.get('latest_run_id')
+    return {ticker: run_id for ticker, run_id in served.items() if _lookup(run_id, index) is not None}
+
+def get_best_run(ticker, path=REGISTRY_PATH):
+    """Run com menor métrica de teste para o ticker; None se o índice não puder responder"""
+    index = load_index(path)
+    if index is None:
+        return None
+    return _lookup(index['best'].get(ticker), index)
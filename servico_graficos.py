@@ -0,0 +1,67 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Renderizações simultâneas e quantidade de PNGs mantidos em memória
+CHART_RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', 2))
+CHART_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 128))
+
+def chart_key(*parts):
+    """Hash dos dados e do título do gráfico (usado como chave de cache e ETag)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ChartService:
+    """Renderiza gráficos em objetos Figure independentes, em um pool limitado de threads
+
+    Cada gráfico usa sua própria Figure (sem o estado global do pyplot), o que
+    permite renderizar com segurança em workers com threads. Os PNGs ficam em
+    um cache LRU indexado pelo hash dos dados plotados.
+    """
+
+    def __init__(self, max_workers=CHART_RENDER_WORKERS, cache_size=CHART_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._cache = OrderedDict()
+        self._rendering = {}
+        self._lock = threading.Lock()
+
+    def _render(self, draw, figsize, dpi):
+        from perfil_inicializacao import timed_import
+        fig = timed_import('matplotlib.figure').Figure(figsize=figsize, dpi=dpi)
+        draw(fig)
+        img = BytesIO()
+        fig.savefig(img, format='png', bbox_inches='tight')
+        return img.getvalue()
+
+    def render(self, key, draw, figsize=(12, 6), dpi=100):
+        """Retornar o PNG da chave, renderizando com `draw(fig)` apenas se não estiver em cache"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            future = self._rendering.get(key)
+            if future is None:
+                future = self._executor.submit(self._render, draw, figsize, dpi)
+                self._rendering[key] = future
+
+        try:
+            png = future.result()
+        finally:
+            with self._lock:
+                self._rendering.pop(key, None)
+
+        with self._lock:
+            self._cache[key] = png
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return png
+
+# Instância por processo
+chart_service = ChartService()
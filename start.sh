@@ -12,8 +12,11 @@ echo "Iniciando treinamento do modelo..."
 python criacao_modelo.py
 
 if [ $? -eq 0 ]; then
-    echo "Treinamento concluído com sucesso. Iniciando a API Flask..."
-    gunicorn -w 4 -b 0.0.0.0:5000 app:app
+    echo "Treinamento concluído com sucesso. Calculando janelas de entrada..."
+    # Repetir após cada fechamento do pregão (ex.: cron) para manter as janelas atuais
+    python armazenamento_janelas.py || echo "Falha ao calcular janelas; a API as prepara por requisição."
+    echo "Iniciando a API Flask..."
+    gunicorn -c gunicorn.conf.py app:app
 else
     echo "Erro durante o treinamento do modelo. Encerrando o container."
     exit 1
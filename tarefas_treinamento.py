@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import uuid
+import signal
+import sqlite3
+import logging
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Banco compartilhado por todos os workers do gunicorn e pelos processos de treinamento
+TRAINING_JOBS_DB = os.environ.get('TRAINING_JOBS_DB', os.path.join(os.getcwd(), 'data', 'tarefas.db'))
+
+# Número máximo de treinamentos ativos (na fila ou executando) ao mesmo tempo
+TRAINING_MAX_CONCURRENT = int(os.environ.get('TRAINING_MAX_CONCURRENT', 1))
+
+# Parâmetros aceitos pelo treinamento (repassados a criacao_modelo.train_model)
+TRAINING_PARAMS = ('ticker', 'start_date', 'end_date', 'window', 'horizon', 'batch_size',
+                   'epochs', 'units', 'dense_units', 'patience')
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Processos iniciados por este worker (para recolher os que já terminaram)
+_children = []
+
+class JobConflictError(Exception):
+    """Limite de tarefas de treinamento ativas atingido"""
+
+@contextmanager
+def _connect(path=TRAINING_JOBS_DB, immediate=False):
+    """Conexão SQLite; `immediate` trava o banco para escrita até o fim do bloco"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                params TEXT,
+                created_at TEXT NOT NULL,
+                start_time TEXT,
+                end_time TEXT,
+                pid INTEGER,
+                epoch INTEGER DEFAULT 0,
+                total_epochs INTEGER,
+                loss REAL,
+                run_id TEXT,
+                metrics TEXT,
+                error TEXT,
+                cancel_requested INTEGER DEFAULT 0
+            )
+        """)
+        if immediate:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        if immediate:
+            conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def _to_dict(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['params'] = json.loads(job['params']) if job['params'] else {}
+    job['metrics'] = json.loads(job['metrics']) if job['metrics'] else None
+    return job
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def _reap_children():
+    """Recolher processos filhos encerrados para não deixar zumbis"""
+    _children[:] = [p for p in _children if p.poll() is None]
+
+def dispatch(path=TRAINING_JOBS_DB):
+    """Iniciar tarefas da fila respeitando o limite de concorrência"""
+    _reap_children()
+    with _connect(path, immediate=True) as conn:
+        # Marcar como falhas as tarefas cujo processo morreu sem atualizar o status
+        for row in conn.execute("SELECT id, pid FROM jobs WHERE status = 'running'").fetchall():
+            if row['pid'] is not None and not _pid_alive(row['pid']):
+                conn.execute("UPDATE jobs SET status = 'failed', end_time = ?, "
+                             "error = 'Processo de treinamento encerrado inesperadamente' "
+                             "WHERE id = ?", (_now(), row['id']))
+
+        running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+        queued = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at "
+                              "LIMIT ?", (max(0, TRAINING_MAX_CONCURRENT - running),)).fetchall()
+
+        for row in queued:
+            # Processo separado dos workers web, em sua própria sessão
+            process = subprocess.Popen([sys.executable, os.path.abspath(__file__), row['id'], path],
+                                       start_new_session=True)
+            _children.append(process)
+            conn.execute("UPDATE jobs SET status = 'running', start_time = ?, pid = ? WHERE id = ?",
+                         (_now(), process.pid, row['id']))
+
+def submit_job(params=None, path=TRAINING_JOBS_DB):
+    """Criar uma tarefa de treinamento; falha se o limite de tarefas ativas foi atingido"""
+    job_id = uuid.uuid4().hex
+    with _connect(path, immediate=True) as conn:
+        active = [row['id'] for row in
+                  conn.execute("SELECT id FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES)]
+        if len(active) >= TRAINING_MAX_CONCURRENT:
+            raise JobConflictError(f"Limite de {TRAINING_MAX_CONCURRENT} treinamento(s) em andamento "
+                                   f"atingido ({', '.join(active)})")
+        conn.execute("INSERT INTO jobs (id, status, params, created_at) VALUES (?, 'queued', ?, ?)",
+                     (job_id, json.dumps(params or {}), _now()))
+    dispatch(path)
+    return get_job(job_id, path)
+
+def get_job(job_id, path=TRAINING_JOBS_DB):
+    with _connect(path) as conn:
+        return _to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+def latest_job(path=TRAINING_JOBS_DB):
+    with _connect(path) as conn:
+        return _to_dict(conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT 1").fetchone())
+
+def cancel_job(job_id, path=TRAINING_JOBS_DB):
+    """Cancelar uma tarefa da fila ou em execução"""
+    with _connect(path, immediate=True) as conn:
+        job = _to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        if job is None or job['status'] not in ACTIVE_STATUSES:
+            return job
+        conn.execute("UPDATE jobs SET status = 'cancelled', cancel_requested = 1, end_time = ? "
+                     "WHERE id = ?", (_now(), job_id))
+
+    if job['status'] == 'running' and job['pid'] is not None:
+        try:
+            os.killpg(job['pid'], signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    dispatch(path)
+    return get_job(job_id, path)
+
+def report_progress(job_id, epoch, total_epochs, loss, path=TRAINING_JOBS_DB):
+    """Registrar o progresso de uma época; retorna True se o cancelamento foi pedido"""
+    with _connect(path) as conn:
+        conn.execute("UPDATE jobs SET epoch = ?, total_epochs = ?, loss = ? WHERE id = ?",
+                     (epoch, total_epochs, loss, job_id))
+        row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+def make_progress_callback(job_id, total_epochs, path=TRAINING_JOBS_DB):
+    """Callback Keras que publica o progresso por época da tarefa"""
+    from tensorflow import keras
+
+    class ProgressCallback(keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            loss = (logs or {}).get('loss')
+            if report_progress(job_id, epoch + 1, total_epochs,
+                               float(loss) if loss is not None else None, path):
+                self.model.stop_training = True
+
+    return ProgressCallback()
+
+def _finish(job_id, path, status, **fields):
+    """Gravar o resultado final, preservando o status de tarefas canceladas"""
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with _connect(path) as conn:
+        conn.execute(f"UPDATE jobs SET status = ?, end_time = ?{', ' if fields else ''}{assignments} "
+                     "WHERE id = ? AND status = 'running'",
+                     (status, _now(), *fields.values(), job_id))
+
+def run_job(job_id, path=TRAINING_JOBS_DB):
+    """Executar o treinamento de uma tarefa (chamado no processo separado)"""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    try:
+        from criacao_modelo import train_model, TRAINING_EPOCHS
+        params = {k: v for k, v in get_job(job_id, path)['params'].items() if k in TRAINING_PARAMS}
+        progress = make_progress_callback(job_id, params.get('epochs', TRAINING_EPOCHS), path)
+        resultado = train_model(**params, callbacks=[progress], tags={'job_id': job_id})
+        _finish(job_id, path, 'completed',
+                run_id=resultado['run_id'],
+                metrics=json.dumps({k: float(v) for k, v in resultado['metrics'].items()}))
+    except BaseException as e:
+        logger.error(f"Erro no treinamento da tarefa {job_id}: {e}")
+        _finish(job_id, path, 'failed', error=str(e))
+        raise
+    finally:
+        dispatch(path)
+
+if __name__ == '__main__':
+    run_job(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else TRAINING_JOBS_DB)
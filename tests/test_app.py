@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import app as app_module
+import monitoramento
+from monitoramento import ModelMonitor
+
+def _resultado(ticker):
+    return {
+        'ticker': ticker,
+        'run_id': 'run-teste',
+        'prediction': 101.0,
+        'ultimo_preco': 100.0,
+        'variacao': 1.0,
+        'horizonte': [101.0],
+        'data': pd.Timestamp('2024-01-02'),
+        'dados': None
+    }
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monitor = ModelMonitor(log_path=str(tmp_path / 'prediction_logs.csv'),
+                           metrics_path=str(tmp_path / 'performance_metrics.csv'))
+    monkeypatch.setattr(app_module, 'model_monitor', monitor)
+    monkeypatch.setattr(monitoramento, 'model_monitor', monitor)
+    monkeypatch.setattr(app_module, 'compute_prediction', lambda ticker: _resultado(ticker))
+    app_module.app.config['TESTING'] = True
+    yield app_module.app.test_client()
+    monitor.flush()
+
+def test_fazer_previsao_retorna_previsao(client):
+    response = client.post('/fazer_previsao', data={'ticker': 'amba'})
+
+    assert response.status_code == 200
+    assert response.get_json()['prediction'] == '$101.00'
+
+def test_fazer_previsao_registra_uma_previsao_numerica(client):
+    monitor = app_module.model_monitor
+    client.post('/fazer_previsao', data={'ticker': 'AMBA'})
+    client.post('/fazer_previsao', data={'ticker': 'NVDA'})
+
+    assert [r['prediction'] for r in monitor.predictions_log] == [101.0, 101.0]
+    metrics = client.get('/metrics/model').get_json()
+    assert metrics['total_predictions'] == 2
+
+def test_previsao_lote_recusa_tickers_que_nao_sao_lista(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'make_batch_prediction', lambda tickers: pytest.fail(tickers))
+
+    response = client.post('/previsoes/lote', json={'tickers': 'AMBA'})
+
+    assert response.status_code == 400
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from armazenamento_janelas import WindowStore, _previous_session
+from janelas import create_windows
+
+class _Precos:
+    """Histórico sintético terminando no último pregão"""
+
+    def __init__(self, closes):
+        self.closes = closes
+        self.sincronizados = []
+
+    def sync_many(self, tickers, start):
+        self.sincronizados.extend(tickers)
+
+    def get_history(self, ticker, start, end=None):
+        if ticker not in self.closes:
+            raise FileNotFoundError(ticker)
+        closes = self.closes[ticker]
+        datas = pd.bdate_range(end=pd.Timestamp(_previous_session()), periods=len(closes))
+        return pd.DataFrame({'Close': closes}, index=datas)
+
+@pytest.fixture
+def precos():
+    rng = np.random.default_rng(0)
+    return _Precos({'AMBA': 100 + rng.normal(0, 2, 90).cumsum(),
+                    'NVDA': 400 + rng.normal(0, 5, 90).cumsum(),
+                    'CURTO': np.arange(10, dtype='float64')})
+
+def test_build_e_get_ida_e_volta(tmp_path, precos):
+    store = WindowStore(str(tmp_path))
+
+    indice = store.build(['amba', 'NVDA', 'CURTO', 'AMBA'], window=30, as_of=_previous_session(), prices=precos)
+
+    assert precos.sincronizados == ['AMBA', 'NVDA', 'CURTO']
+    assert sorted(indice['tickers']) == ['AMBA', 'NVDA']
+    for ticker in ['AMBA', 'NVDA']:
+        janela = store.get(ticker.lower(), window=30)
+        closes = precos.closes[ticker][-30:]
+        assert janela['X'].shape == (1, 30, 1)
+        assert janela['date'] == pd.Timestamp(_previous_session())
+        assert janela['last_close'] == pytest.approx(closes[-1])
+        # Desfazer a normalização devolve os fechamentos originais
+        np.testing.assert_allclose(janela['X'][0, :, 0] * janela['data_range'] + janela['data_min'],
+                                   closes, rtol=1e-5)
+    assert store.get('CURTO', window=30) is None
+    assert store.get('AMBA', window=60) is None
+
+def test_janela_igual_a_de_create_windows(tmp_path, precos):
+    store = WindowStore(str(tmp_path))
+    store.build(['AMBA'], window=30, as_of=_previous_session(), prices=precos)
+
+    closes = precos.closes['AMBA'][-30:]
+    normalizados = (closes - closes.min()) / (closes.max() - closes.min())
+    X, _ = create_windows(normalizados, window=30, horizon=0)
+
+    np.testing.assert_allclose(store.get('AMBA', window=30)['X'], X[-1:], rtol=1e-6)
@@ -0,0 +1,83 @@
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from armazenamento_precos import COLUMNS, LocalFileProvider, PriceStore
+
+class _FonteLenta:
+    """Fonte que demora em cada consulta e registra quantas rodam ao mesmo tempo"""
+
+    def __init__(self, espera=0.2):
+        self.espera = espera
+        self.ativas = 0
+        self.maximo = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker, start, end):
+        with self._lock:
+            self.ativas += 1
+            self.maximo = max(self.maximo, self.ativas)
+        time.sleep(self.espera)
+        with self._lock:
+            self.ativas -= 1
+        datas = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        closes = 100 + np.arange(len(datas), dtype='float64')
+        return pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes,
+                             'Close': closes, 'Volume': 1000.0}, index=datas)
+
+def test_sync_many_busca_tickers_diferentes_em_paralelo(tmp_path):
+    fonte = _FonteLenta()
+    store = PriceStore(base_dir=str(tmp_path), provider=fonte)
+
+    erros = store.sync_many(['AAA', 'BBB', 'CCC', 'DDD'], '2024-01-01', max_workers=4)
+
+    assert erros == {'AAA': None, 'BBB': None, 'CCC': None, 'DDD': None}
+    assert fonte.maximo == 4
+
+def test_sync_do_mesmo_ticker_consulta_a_fonte_uma_vez(tmp_path):
+    fonte = _FonteLenta()
+    consultas = []
+    fetch = fonte.fetch
+    fonte.fetch = lambda *args: consultas.append(args) or fetch(*args)
+    store = PriceStore(base_dir=str(tmp_path), provider=fonte)
+
+    store.sync_many(['AAA'] * 4, '2024-01-01', max_workers=4)
+
+    assert len(consultas) == 1
+
+@pytest.mark.parametrize('ticker', ['../../../escapou', '..', 'AMBA/../X', '', 'A' * 16, "AMBA' OR 1=1"])
+def test_ticker_invalido_recusado_sem_tocar_o_disco(tmp_path, ticker):
+    store = PriceStore(base_dir=str(tmp_path / 'precos'), provider=_FonteLenta(espera=0))
+
+    with pytest.raises(ValueError):
+        store.get_history(ticker, '2024-01-01')
+
+    assert list(tmp_path.iterdir()) == []
+
+def test_ticker_sem_dados_nao_deixa_diretorio(tmp_path):
+    store = PriceStore(base_dir=str(tmp_path), provider=LocalFileProvider(str(tmp_path)))
+
+    with pytest.raises(FileNotFoundError):
+        store.get_history('NAOEXISTE', '2024-01-01')
+
+    assert list(tmp_path.iterdir()) == []
+
+def test_local_file_provider_ida_e_volta(tmp_path):
+    datas = pd.bdate_range('2024-01-01', '2024-03-29')
+    closes = 100 + np.arange(len(datas), dtype='float64')
+    original = pd.DataFrame({'Open': closes - 1, 'High': closes + 1, 'Low': closes - 2,
+                             'Close': closes, 'Volume': 1000.0}, index=datas)
+    csv_dir = tmp_path / 'csv'
+    csv_dir.mkdir()
+    original.to_csv(csv_dir / 'AMBA.csv')
+    store = PriceStore(base_dir=str(tmp_path / 'precos'), provider=LocalFileProvider(str(csv_dir)))
+
+    dados = store.get_history('amba', '2024-01-01', '2024-03-01')
+
+    esperado = original[original.index < '2024-03-01']
+    np.testing.assert_array_equal(dados.index.values, esperado.index.values)
+    np.testing.assert_allclose(dados[COLUMNS].to_numpy(), esperado[COLUMNS].to_numpy())
+    assert (tmp_path / 'precos' / 'AMBA' / 'meta.json').exists()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest_walk_forward
+from backtest_walk_forward import walk_forward_backtest
+
+class _Modelo:
+    """Modelo que registra os dados de cada treino e prevê sempre 1 (o topo da escala)"""
+
+    def __init__(self, treinos):
+        self.treinos = treinos
+
+    def fit(self, dataset, epochs, verbose=0):
+        self.treinos.append(dataset)
+
+    def predict(self, X, batch_size=None, verbose=0):
+        return np.ones((len(X), 1), dtype='float32')
+
+@pytest.fixture
+def treinos(monkeypatch):
+    treinos = []
+    monkeypatch.setattr(backtest_walk_forward, 'build_model', lambda *args, **kwargs: _Modelo(treinos))
+    monkeypatch.setattr(backtest_walk_forward, 'make_dataset', lambda X, y, batch_size, shuffle=False: (X, y))
+    return treinos
+
+def test_folds_sem_olhar_o_futuro(treinos):
+    # Fechamento igual à posição do pregão: o valor identifica a barra de onde veio
+    datas = pd.bdate_range('2020-01-01', periods=120)
+    dados = pd.DataFrame({'Close': np.arange(120, dtype='float64')}, index=datas)
+
+    resultado = walk_forward_backtest(dados=dados, window=10, min_train=50, retrain_every=25,
+                                      warm_start=False, rolling=5)
+
+    # 110 janelas: blocos [50, 75), [75, 100), [100, 110)
+    folds = resultado['folds']
+    assert [(f['treino'], f['teste']) for f in folds] == [(50, 25), (75, 25), (100, 10)]
+    assert [f['inicio'] for f in folds] == [datas[60], datas[85], datas[110]]
+    assert [f['fim'] for f in folds] == [datas[84], datas[109], datas[119]]
+
+    for fold, (X_train, y_train) in zip(folds, treinos):
+        # Treino normalizado só com os preços conhecidos antes do primeiro alvo do bloco
+        primeiro_alvo = 10 + fold['treino']
+        assert len(X_train) == fold['treino']
+        lo, topo = 0.0, primeiro_alvo - 1
+        assert (X_train * (topo - lo) + lo).max() == pytest.approx(topo - 1)
+        assert (y_train * (topo - lo) + lo).max() == pytest.approx(topo)
+
+    # Prever o topo da escala devolve o último fechamento conhecido no início do bloco
+    previsoes = resultado['previsoes']
+    assert previsoes.index.equals(datas[60:])
+    for fold in folds:
+        bloco = previsoes[previsoes['fold'] == fold['fold']]
+        assert (bloco['previsto'] == 10 + fold['treino'] - 1).all()
+        assert (bloco['real'] == np.arange(10 + fold['treino'], 10 + fold['treino'] + fold['teste'])).all()
+
+def test_dados_insuficientes(treinos):
+    dados = pd.DataFrame({'Close': np.arange(30, dtype='float64')},
+                         index=pd.bdate_range('2020-01-01', periods=30))
+
+    with pytest.raises(ValueError):
+        walk_forward_backtest(dados=dados, window=10, min_train=20)
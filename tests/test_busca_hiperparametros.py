@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import busca_hiperparametros
+from busca_hiperparametros import n_survivors, rung_schedule, search
+
+@pytest.mark.parametrize('min_epochs, max_epochs, eta, esperado', [
+    (2, 18, 3, [2, 6, 18]),
+    (1, 27, 3, [1, 3, 9, 27]),
+    (2, 20, 3, [2, 6, 18, 20]),
+    (5, 5, 2, [5]),
+])
+def test_rung_schedule(min_epochs, max_epochs, eta, esperado):
+    assert rung_schedule(min_epochs, max_epochs, eta) == esperado
+
+@pytest.mark.parametrize('n, eta, esperado', [(27, 3, 9), (9, 3, 3), (10, 3, 4), (2, 3, 1), (1, 3, 1), (5, 2, 3)])
+def test_n_survivors(n, eta, esperado):
+    assert n_survivors(n, eta) == esperado
+
+def test_search_poda_por_rodada(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MLFLOW_ALLOW_FILE_STORE', 'true')
+    monkeypatch.setattr(busca_hiperparametros.price_store, 'get_history',
+                        lambda *args: pd.DataFrame({'Close': np.arange(100.0)}))
+    monkeypatch.setattr(busca_hiperparametros, 'ProcessPoolExecutor',
+                        lambda max_workers, **kwargs: ThreadPoolExecutor(max_workers))
+    rodadas = []
+
+    def run_trial(trial_id, config, closes, epochs_done, epochs, model_dir):
+        # Perda determinística: trials de menor id são melhores
+        rodadas.append((trial_id, epochs_done, epochs))
+        return {'trial_id': trial_id, 'epochs': epochs, 'val_loss': float(trial_id + 1),
+                'val_loss_history': [float(trial_id + 1)] * (epochs - epochs_done), 'seconds': 0.0}
+
+    monkeypatch.setattr(busca_hiperparametros, '_run_trial', run_trial)
+
+    resumo = search(n_trials=10, min_epochs=2, max_epochs=18, eta=3, max_workers=2, seed=0)
+
+    # 10 trials -> 4 -> 2 (ceil) com 2, 6 e 18 épocas acumuladas
+    assert sorted(rodadas) == sorted([(t, 0, 2) for t in range(10)] + [(t, 2, 6) for t in range(4)] +
+                                     [(t, 6, 18) for t in range(2)])
+    assert [t['epochs'] for t in resumo['trials']] == [18, 18, 6, 6] + [2] * 6
+    assert resumo['melhor']['trial_id'] == 0
+    assert resumo['epocas_gastas'] == 2 * 18 + 2 * 6 + 6 * 2
+    assert resumo['fracao_custo'] == pytest.approx(60 / (10 * 18))
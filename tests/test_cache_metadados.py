@@ -0,0 +1,56 @@
+import json
+import threading
+
+from cache_metadados import StaleWhileRevalidateCache
+
+def _vencer(cache, key):
+    fetched_at, value = cache._entries[key]
+    cache._entries[key] = (fetched_at - cache.ttl - 1, value)
+
+def test_leitura_vencida_responde_o_valor_antigo_e_atualiza_uma_vez():
+    cache = StaleWhileRevalidateCache(ttl=60)
+    cache.get('AMBA', lambda: 'v1')
+    _vencer(cache, 'AMBA')
+    liberar = threading.Event()
+    buscas = []
+
+    def fetch():
+        buscas.append(1)
+        liberar.wait(5)
+        return 'v2'
+
+    respostas = [cache.get('AMBA', fetch) for _ in range(10)]
+    liberar.set()
+    cache._executor.shutdown(wait=True)
+
+    assert respostas == ['v1'] * 10
+    assert len(buscas) == 1
+    assert cache.get('AMBA', fetch) == 'v2'
+
+def test_falha_na_atualizacao_mantem_o_valor_antigo():
+    cache = StaleWhileRevalidateCache(ttl=60)
+    cache.get('AMBA', lambda: 'v1')
+    _vencer(cache, 'AMBA')
+
+    def fetch():
+        raise ConnectionError('fonte fora do ar')
+
+    assert cache.get('AMBA', fetch) == 'v1'
+    cache._executor.shutdown(wait=True)
+
+    assert cache._entries['AMBA'][1] == 'v1'
+    assert 'AMBA' not in cache._refreshing
+
+def test_descarta_as_chaves_usadas_ha_mais_tempo(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = StaleWhileRevalidateCache(ttl=60, path=path, maxsize=2)
+
+    cache.get('AMBA', lambda: 1)
+    cache.get('NVDA', lambda: 2)
+    cache.get('AMBA', lambda: 1)
+    cache.get('TSLA', lambda: 3)
+
+    assert list(cache._entries) == ['AMBA', 'TSLA']
+    with open(path) as f:
+        assert sorted(json.load(f)) == ['AMBA', 'TSLA']
+    assert list(StaleWhileRevalidateCache(ttl=60, path=path, maxsize=1)._entries) == ['TSLA']
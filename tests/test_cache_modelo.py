@@ -0,0 +1,41 @@
+import pytest
+
+import previsao_fechamento_acao
+from cache_modelo import ModelCache
+
+def test_cada_ticker_usa_o_proprio_modelo(monkeypatch):
+    runs = {'AMBA': 'run-amba', 'NVDA': 'run-nvda'}
+    monkeypatch.setattr(previsao_fechamento_acao, 'get_latest_model', lambda ticker=None: runs[ticker])
+    cache = ModelCache(check_interval=0)
+    monkeypatch.setattr(cache, '_load', lambda run_id: f'modelo-{run_id}')
+    trocas = []
+    cache.on_swap(lambda ticker, run_id: trocas.append((ticker, run_id)))
+
+    assert cache.get_model('amba') == ('run-amba', 'modelo-run-amba')
+    assert cache.get_model('NVDA') == ('run-nvda', 'modelo-run-nvda')
+
+    # Um novo run de NVDA não altera o modelo servido para AMBA
+    runs['NVDA'] = 'run-nvda-2'
+    assert cache.get_model('NVDA')[0] == 'run-nvda-2'
+    assert cache.get_model('AMBA')[0] == 'run-amba'
+    assert trocas == [('AMBA', 'run-amba'), ('NVDA', 'run-nvda'), ('NVDA', 'run-nvda-2')]
+
+def test_tracking_uri_configurado_mesmo_com_run_do_indice(monkeypatch):
+    import cache_modelo
+    import mlflow
+
+    monkeypatch.setitem(cache_modelo._tracking, 'mlflow', None)
+    mlflow.set_tracking_uri('file:/outro/lugar')
+    monkeypatch.setattr(previsao_fechamento_acao, 'get_latest_run', lambda ticker=None: {'run_id': 'run-amba'})
+    monkeypatch.setattr(cache_modelo, 'load_from_run', lambda run_id: f'numpy-{run_id}')
+    monkeypatch.setattr(cache_modelo, 'INFERENCE_ENGINE', 'numpy')
+
+    assert ModelCache(check_interval=0).get_model('AMBA') == ('run-amba', 'numpy-run-amba')
+    assert mlflow.get_tracking_uri() == cache_modelo.MLFLOW_TRACKING_URI
+
+def test_ticker_invalido_recusado_antes_do_filtro_do_mlflow(monkeypatch):
+    monkeypatch.setattr(previsao_fechamento_acao, 'get_latest_run', lambda ticker=None: None)
+    monkeypatch.setattr(previsao_fechamento_acao, 'get_mlflow', lambda: pytest.fail('MLflow consultado'))
+
+    with pytest.raises(ValueError):
+        previsao_fechamento_acao.get_latest_model("AMBA' OR params.ticker != '")
@@ -0,0 +1,75 @@
+import time
+import threading
+
+import pytest
+
+import cache_resultados
+from cache_resultados import ResultCache
+
+def _em_paralelo(n, funcao):
+    """Executar `funcao` em n threads liberadas ao mesmo tempo; retorna os resultados"""
+    largada = threading.Barrier(n)
+    resultados = [None] * n
+
+    def executar(i):
+        largada.wait()
+        try:
+            resultados[i] = funcao()
+        except Exception as e:
+            resultados[i] = e
+
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+def test_chave_fria_calculada_uma_vez_para_requisicoes_concorrentes():
+    cache = ResultCache()
+    chamadas = []
+
+    def compute():
+        chamadas.append(1)
+        time.sleep(0.2)
+        return object()
+
+    resultados = _em_paralelo(16, lambda: cache.get_or_compute(('AMBA', 60), compute))
+
+    assert len(chamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+
+def test_erro_do_calculo_chega_a_todas_as_requisicoes_e_nao_fica_em_cache():
+    cache = ResultCache()
+
+    def falha():
+        time.sleep(0.2)
+        raise ValueError('sem dados')
+
+    resultados = _em_paralelo(4, lambda: cache.get_or_compute('AMBA', falha))
+
+    assert all(isinstance(r, ValueError) for r in resultados)
+    assert cache.get_or_compute('AMBA', lambda: 1) == 1
+
+def test_entrada_expira_apos_o_ttl(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(cache_resultados.time, 'time', lambda: agora[0])
+    cache = ResultCache(ttl=60)
+
+    assert cache.get_or_compute('AMBA', lambda: 'antigo') == 'antigo'
+    agora[0] += 59
+    assert cache.get_or_compute('AMBA', lambda: 'novo') == 'antigo'
+    agora[0] += 2
+    assert cache.get_or_compute('AMBA', lambda: 'novo') == 'novo'
+
+def test_descarta_a_entrada_usada_ha_mais_tempo():
+    cache = ResultCache(maxsize=2)
+    cache.get_or_compute('A', lambda: 'a')
+    cache.get_or_compute('B', lambda: 'b')
+    # Usar A torna B a entrada mais antiga
+    cache.get_or_compute('A', lambda: pytest.fail('A deveria estar em cache'))
+
+    cache.get_or_compute('C', lambda: 'c')
+
+    assert cache.get_or_compute('A', lambda: 'a2') == 'a'
+    assert cache.get_or_compute('B', lambda: 'b2') == 'b2'
@@ -0,0 +1,146 @@
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+
+import cliente_mercado
+from cliente_mercado import MarketDataClient, MarketDataError, TokenBucket
+
+class _Resposta:
+    def __init__(self, retry_after):
+        self.headers = {'Retry-After': retry_after}
+
+def test_retry_after_limitado_a_espera_maxima(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(cliente_mercado.time, 'sleep', esperas.append)
+    client = MarketDataClient(max_backoff=5)
+
+    client._wait(0, _Resposta('3600'))
+    client._wait(0, _Resposta('2'))
+
+    assert esperas == [5, 2]
+
+class _Stub(BaseHTTPRequestHandler):
+    """API de cotações local: o ticker no caminho escolhe o comportamento"""
+
+    # Respostas de erro a enviar antes de responder normalmente, por ticker
+    falhas = {}
+    requisicoes = []
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        ticker = url.path.rsplit('/', 1)[1]
+        self.requisicoes.append((time.monotonic(), ticker))
+
+        pendentes = self.falhas.get(ticker)
+        if pendentes:
+            status, headers = pendentes.pop(0)
+            return self._json(status, {}, headers)
+
+        if '/quoteSummary/' in url.path:
+            return self._json(200, {'quoteSummary': {'error': None, 'result': [{
+                'price': {'longName': 'Ambarella, Inc.', 'marketCap': {'raw': 2.5e9, 'fmt': '2.5B'},
+                          'averageDailyVolume3Month': {'raw': 900000}},
+                'assetProfile': {'sector': 'Technology', 'industry': 'Semiconductors'}}]}})
+
+        query = parse_qs(url.query)
+        dias = pd.bdate_range(pd.Timestamp(int(query['period1'][0]), unit='s'),
+                              pd.Timestamp(int(query['period2'][0]), unit='s') - pd.Timedelta(days=1))
+        closes = [100.0 + i for i in range(len(dias))]
+        self._json(200, {'chart': {'error': None, 'result': [{
+            'meta': {'gmtoffset': 0},
+            'timestamp': [int(d.timestamp()) for d in dias],
+            'indicators': {'quote': [{'open': closes, 'high': closes, 'low': closes,
+                                      'close': closes, 'volume': [1000] * len(closes)}]}}]}})
+
+@pytest.fixture
+def servidor():
+    _Stub.falhas = {}
+    _Stub.requisicoes = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+def test_busca_historico_no_servidor(servidor):
+    client = MarketDataClient(base_url=servidor)
+
+    dados = client.fetch_history('AMBA', '2024-01-01', '2024-01-06')
+
+    assert list(dados.index.strftime('%Y-%m-%d')) == ['2024-01-01', '2024-01-02', '2024-01-03',
+                                                      '2024-01-04', '2024-01-05']
+    assert list(dados['Close']) == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+def test_429_respeita_retry_after_limitado(servidor):
+    _Stub.falhas['LIMITE'] = [(429, {'Retry-After': '3600'})]
+    client = MarketDataClient(base_url=servidor, backoff=0.001, max_backoff=0.3)
+
+    inicio = time.monotonic()
+    dados = client.fetch_history('LIMITE', '2024-01-01', '2024-01-06')
+    espera = time.monotonic() - inicio
+
+    assert len(dados) == 5
+    assert [t for _, t in _Stub.requisicoes] == ['LIMITE', 'LIMITE']
+    assert 0.3 <= espera < 2
+
+def test_5xx_repetido_ate_responder(servidor):
+    _Stub.falhas['INSTAVEL'] = [(503, {}), (502, {})]
+    client = MarketDataClient(base_url=servidor, retries=3, backoff=0.001)
+
+    assert len(client.fetch_history('INSTAVEL', '2024-01-01', '2024-01-06')) == 5
+    assert len(_Stub.requisicoes) == 3
+
+def test_5xx_persistente_esgota_as_tentativas(servidor):
+    _Stub.falhas['FORA'] = [(500, {})] * 5
+    client = MarketDataClient(base_url=servidor, retries=2, backoff=0.001)
+
+    with pytest.raises(MarketDataError):
+        client.fetch_history('FORA', '2024-01-01', '2024-01-06')
+    assert len(_Stub.requisicoes) == 3
+
+def test_token_bucket_espaca_as_requisicoes(servidor):
+    client = MarketDataClient(base_url=servidor, rate=20, burst=2)
+
+    for _ in range(6):
+        client.fetch_history('AMBA', '2024-01-01', '2024-01-03')
+
+    # Duas fichas da rajada e as outras quatro a 20/s: pelo menos 0,2 s entre a 1ª e a 6ª
+    momentos = [t for t, _ in _Stub.requisicoes]
+    assert momentos[-1] - momentos[0] >= 0.19
+
+def test_token_bucket_retorna_a_espera():
+    bucket = TokenBucket(rate=50, capacity=1)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.02, abs=0.01)
+
+def test_busca_dados_cadastrais(servidor):
+    info = MarketDataClient(base_url=servidor).fetch_info('AMBA')
+
+    assert info == {'longName': 'Ambarella, Inc.', 'sector': 'Technology',
+                    'industry': 'Semiconductors', 'marketCap': 2.5e9,
+                    'averageVolume3months': 900000}
+
+def test_dados_cadastrais_da_acao_usam_o_cliente_compartilhado(monkeypatch):
+    import inf_acao
+    monkeypatch.setattr(inf_acao, 'PRICE_PROVIDER', 'http')
+    monkeypatch.setattr(cliente_mercado.market_data_client, 'fetch_info',
+                        lambda ticker: {'longName': f'{ticker} Inc.'})
+
+    assert inf_acao._fetch_info('AMBA') == {'longName': 'AMBA Inc.'}
@@ -0,0 +1,65 @@
+import os
+import runpy
+
+import pytest
+
+import cache_modelo
+import registro_modelos
+from cache_modelo import ModelCache
+
+class _Log:
+    def __init__(self):
+        self.linhas = []
+
+    def info(self, mensagem):
+        self.linhas.append(mensagem)
+
+    warning = info
+
+class _Server:
+    def __init__(self):
+        self.log = _Log()
+
+@pytest.fixture
+def conf(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path / 'metricas'))
+    monkeypatch.setenv('GUNICORN_PRELOAD', '1')
+    return runpy.run_path(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+
+def test_on_starting_limpa_apenas_metricas_antigas(conf, tmp_path, monkeypatch):
+    monkeypatch.setitem(conf['on_starting'].__globals__, 'preload_app', False)
+    metricas = tmp_path / 'metricas'
+    (metricas / 'counter_1.db').write_bytes(b'')
+    (metricas / f'counter_{os.getpid()}.db').write_bytes(b'')
+
+    # Reler a configuração (como num HUP) não apaga nada
+    runpy.run_path(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+    assert len(os.listdir(metricas)) == 2
+
+    conf['on_starting'](_Server())
+    assert os.listdir(metricas) == [f'counter_{os.getpid()}.db']
+
+def test_on_starting_pre_carrega_apenas_runs_com_pesos_numpy(conf, tmp_path, monkeypatch):
+    registro = str(tmp_path / 'registro.json')
+    for run_id, ticker, inicio in [('run-amba', 'AMBA', 1), ('run-nvda', 'NVDA', 2)]:
+        artefato = tmp_path / run_id
+        artefato.mkdir()
+        registro_modelos.register_run(run_id, ticker, inicio, {}, str(artefato), path=registro)
+    monkeypatch.setattr(registro_modelos, 'REGISTRY_PATH', registro)
+    monkeypatch.setattr(registro_modelos.get_served_runs, '__defaults__', (registro,))
+
+    def load_from_run(run_id):
+        if run_id == 'run-nvda':
+            raise FileNotFoundError('modelo_numpy/modelo_lstm.npz')
+        return f'numpy-{run_id}'
+
+    monkeypatch.setattr(cache_modelo, 'load_from_run', load_from_run)
+    cache = ModelCache()
+    monkeypatch.setattr(cache_modelo, 'model_cache', cache)
+    monkeypatch.setattr(cache, '_load', lambda run_id: pytest.fail('Keras carregado no master'))
+    server = _Server()
+
+    conf['on_starting'](server)
+
+    assert cache._entries == {'AMBA': ('run-amba', 'numpy-run-amba')}
+    assert any('run-nvda' in linha and 'sem pesos NumPy' in linha for linha in server.log.linhas)
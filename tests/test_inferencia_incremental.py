@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+import inferencia_incremental
+from inferencia_incremental import IncrementalPredictor
+from motor_numpy import NumpyLSTMModel
+
+def _modelo(seed):
+    rng = np.random.default_rng(seed)
+    pesos = lambda *shape: rng.normal(0, 0.3, shape).astype('float32')
+    return NumpyLSTMModel([(pesos(1, 16), pesos(4, 16), pesos(16))],
+                          [(pesos(4, 1), pesos(1), 'linear')])
+
+def _dados(n=20, inicio=100.0):
+    datas = pd.bdate_range('2024-01-01', periods=n)
+    return pd.DataFrame({'Close': inicio + np.sin(np.arange(n))}, index=datas)
+
+def test_pesos_extraidos_uma_vez_por_run_e_descartados_quando_nao_servem(monkeypatch):
+    extraidos = []
+    extract = inferencia_incremental.extract_weights
+    monkeypatch.setattr(inferencia_incremental, 'extract_weights',
+                        lambda model: extraidos.append(model) or extract(model))
+    predictor = IncrementalPredictor()
+    modelos = {'run-amba': _modelo(0), 'run-nvda': _modelo(1), 'run-amba-2': _modelo(2)}
+
+    # Tickers servidos por modelos diferentes, alternados
+    for i in range(3):
+        predictor.predict('AMBA', 'run-amba', modelos['run-amba'], _dados(inicio=100 + i), 10)
+        predictor.predict('NVDA', 'run-nvda', modelos['run-nvda'], _dados(inicio=200 + i), 10)
+    assert len(extraidos) == 2
+
+    # Novo modelo para AMBA: os pesos do run anterior deixam de ser mantidos
+    predictor.predict('AMBA', 'run-amba-2', modelos['run-amba-2'], _dados(), 10)
+    assert sorted(predictor._weights) == ['run-amba-2', 'run-nvda']
+
+def test_previsao_igual_a_da_janela_completa():
+    modelo = _modelo(3)
+    dados = _dados()
+
+    horizonte = IncrementalPredictor().predict('AMBA', 'run', modelo, dados, 10)
+
+    closes = dados['Close'].values[-10:]
+    escala = closes.max() - closes.min()
+    esperado = modelo.predict(((closes - closes.min()) / escala).reshape(1, 10, 1)) * escala + closes.min()
+    np.testing.assert_allclose(horizonte, esperado.ravel(), rtol=1e-5)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from janelas import create_windows
+
+def _janelas_em_laco(data, window, horizon, stride, target_column=0):
+    X, y = [], []
+    for inicio in range(0, len(data) - window - horizon + 1, stride):
+        X.append(data[inicio:inicio + window])
+        y.append(data[inicio + window:inicio + window + horizon, target_column])
+    return np.array(X), np.array(y)
+
+@pytest.mark.parametrize('window, horizon, stride', [(60, 1, 1), (5, 3, 1), (5, 1, 4), (7, 5, 3)])
+def test_formato_e_conteudo_iguais_ao_laco(window, horizon, stride):
+    data = np.arange(200, dtype='float32').reshape(100, 2)
+
+    X, y = create_windows(data, window=window, horizon=horizon, stride=stride)
+
+    esperado_X, esperado_y = _janelas_em_laco(data, window, horizon, stride)
+    n = (100 - window - horizon) // stride + 1
+    assert X.shape == (n, window, 2)
+    assert y.shape == (n, horizon)
+    np.testing.assert_array_equal(X, esperado_X)
+    np.testing.assert_array_equal(y, esperado_y)
+
+def test_alvo_logo_apos_a_janela_e_sem_copia():
+    data = np.arange(10, dtype='float64')
+
+    X, y = create_windows(data, window=3, horizon=2, stride=2, target_column=0)
+
+    np.testing.assert_array_equal(X[:, :, 0], [[0, 1, 2], [2, 3, 4], [4, 5, 6]])
+    np.testing.assert_array_equal(y, [[3, 4], [5, 6], [7, 8]])
+    assert np.shares_memory(X, data)
+
+def test_coluna_alvo():
+    data = np.stack([np.arange(10), np.arange(100, 110)], axis=1)
+
+    _, y = create_windows(data, window=4, horizon=1, target_column=1)
+
+    np.testing.assert_array_equal(y[:, 0], np.arange(104, 110))
+
+@pytest.mark.parametrize('tamanho', [0, 5, 60])
+def test_serie_curta_retorna_arrays_vazios(tamanho):
+    X, y = create_windows(np.zeros(tamanho, dtype='float32'), window=60, horizon=1)
+
+    assert X.shape == (0, 60, 1)
+    assert y.shape == (0, 1)
+    assert X.dtype == y.dtype == np.float32
@@ -0,0 +1,33 @@
+import csv
+
+from monitoramento import RotatingCSVWriter
+
+def _linhas(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def test_rotaciona_ao_passar_do_limite_e_mantem_apenas_os_backups(tmp_path):
+    path = str(tmp_path / 'prediction_logs.csv')
+    writer = RotatingCSVWriter(path, ['lote', 'valor'], max_bytes=200, backup_count=2)
+
+    # Cada lote (~100 bytes) completa o limite do arquivo: rotação a cada 2 lotes
+    for lote in range(7):
+        writer.write([{'lote': lote, 'valor': 'x' * 20} for _ in range(4)])
+
+    arquivos = sorted(p.name for p in tmp_path.iterdir() if not p.name.endswith('.lock'))
+    assert arquivos == ['prediction_logs.csv', 'prediction_logs.csv.1', 'prediction_logs.csv.2']
+
+    # Mais recente no arquivo atual; os lotes mais antigos foram descartados
+    assert {r['lote'] for r in _linhas(path)} == {'6'}
+    assert {r['lote'] for r in _linhas(path + '.1')} == {'4', '5'}
+    assert {r['lote'] for r in _linhas(path + '.2')} == {'2', '3'}
+
+def test_sem_backups_o_arquivo_e_reiniciado(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    writer = RotatingCSVWriter(path, ['valor'], max_bytes=10, backup_count=0)
+
+    writer.write([{'valor': 'primeiro-lote'}])
+    writer.write([{'valor': 'segundo-lote'}])
+
+    assert [r['valor'] for r in _linhas(path)] == ['segundo-lote']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['log.csv', 'log.csv.lock']
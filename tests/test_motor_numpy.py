@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import cache_modelo
+from cache_modelo import ModelCache
+from motor_numpy import NumpyLSTMModel, export_weights, extract_weights
+
+@pytest.fixture(scope='module')
+def modelo_keras():
+    pytest.importorskip('tensorflow')
+    from criacao_modelo import build_model
+    return build_model(window=20, units=8, dense_units=4, horizon=3)
+
+def test_motor_numpy_reproduz_o_keras(modelo_keras):
+    X = np.random.default_rng(0).random((32, 20, 1), dtype='float32')
+
+    numpy_model = NumpyLSTMModel(*extract_weights(modelo_keras))
+
+    diferenca = np.max(np.abs(modelo_keras.predict(X, verbose=0) - numpy_model.predict(X)))
+    assert diferenca < 1e-5
+
+def test_pesos_exportados_carregam_o_mesmo_modelo(modelo_keras, tmp_path):
+    X = np.random.default_rng(1).random((8, 20, 1), dtype='float32')
+
+    path = export_weights(modelo_keras, str(tmp_path / 'modelo_lstm.npz'))
+
+    np.testing.assert_array_equal(NumpyLSTMModel.load(path).predict(X),
+                                  NumpyLSTMModel(*extract_weights(modelo_keras)).predict(X))
+
+def test_sem_artefato_numpy_carrega_o_modelo_keras(monkeypatch):
+    def sem_artefato(run_id):
+        raise FileNotFoundError(f"{run_id}/modelo_numpy/modelo_lstm.npz")
+
+    class _MlflowKeras:
+        @staticmethod
+        def load_model(uri):
+            return f'keras:{uri}'
+
+    monkeypatch.setattr(cache_modelo, 'INFERENCE_ENGINE', 'numpy')
+    monkeypatch.setattr(cache_modelo, 'load_from_run', sem_artefato)
+    monkeypatch.setattr(cache_modelo, 'timed_import', lambda module: _MlflowKeras)
+
+    assert ModelCache()._load('run-antigo') == 'keras:runs:/run-antigo/modelo_lstm'
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import previsao_fechamento_acao as previsao
+from cache_resultados import ResultCache
+
+class _Modelo:
+    def predict(self, X, verbose=0):
+        return np.full((len(X), 1), 0.5, dtype='float32')
+
+@pytest.fixture
+def modelo_janela_30(monkeypatch):
+    previsao.model_window.cache_clear()
+    monkeypatch.setattr(previsao, 'get_run', lambda run_id: {'params': {'window': 30, 'horizon': 1}})
+    monkeypatch.setattr(previsao.model_cache, 'get_model', lambda ticker=None: ('run-30', _Modelo()))
+    monkeypatch.setattr(previsao, 'result_cache', ResultCache())
+    janelas = []
+
+    def load_window(ticker, sequence_length):
+        janelas.append(sequence_length)
+        return {'X': np.zeros((1, sequence_length, 1), dtype='float32'), 'data_min': 90.0,
+                'data_range': 20.0, 'date': pd.Timestamp('2024-01-02'), 'last_close': 100.0,
+                'dados': None}
+
+    monkeypatch.setattr(previsao, 'load_window', load_window)
+    yield janelas
+    previsao.model_window.cache_clear()
+
+def test_previsao_usa_a_janela_do_modelo(modelo_janela_30):
+    resultado = previsao.compute_prediction('AMBA')
+
+    assert modelo_janela_30 == [30]
+    assert resultado['prediction'] == pytest.approx(100.0)
+
+def test_previsao_recusa_janela_diferente_da_do_modelo(modelo_janela_30):
+    with pytest.raises(ValueError):
+        previsao.compute_prediction('AMBA', sequence_length=60)
+
+def test_aquecimento_cobre_todos_os_runs_servidos(monkeypatch):
+    previsao.model_window.cache_clear()
+    runs = {'AMBA': 'run-amba', 'NVDA': 'run-nvda', 'TSLA': 'run-amba', None: 'run-nvda'}
+    monkeypatch.setattr(previsao, 'get_served_runs', lambda: runs)
+    monkeypatch.setattr(previsao, 'get_run', lambda run_id: {'params': {'window': 30}})
+    inferencias = []
+
+    class _Contador(_Modelo):
+        def predict(self, X, verbose=0):
+            inferencias.append(X.shape)
+            return super().predict(X)
+
+    monkeypatch.setattr(previsao.model_cache, 'get_model',
+                        lambda ticker=None: (runs[ticker], _Contador()))
+
+    assert previsao.warm_up() == ['run-amba', 'run-nvda']
+    assert inferencias == [(1, 30, 1), (1, 30, 1)]
+    previsao.model_window.cache_clear()
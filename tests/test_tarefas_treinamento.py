@@ -0,0 +1,19 @@
+import pytest
+
+import tarefas_treinamento
+from tarefas_treinamento import JobConflictError, submit_job
+
+@pytest.fixture
+def banco(monkeypatch, tmp_path):
+    # Sem iniciar processos de treinamento: as tarefas ficam na fila
+    monkeypatch.setattr(tarefas_treinamento, 'dispatch', lambda path: None)
+    return str(tmp_path / 'tarefas.db')
+
+def test_submit_job_respeita_limite_de_tarefas_ativas(monkeypatch, banco):
+    monkeypatch.setattr(tarefas_treinamento, 'TRAINING_MAX_CONCURRENT', 2)
+
+    submit_job({'ticker': 'AMBA'}, path=banco)
+    submit_job({'ticker': 'NVDA'}, path=banco)
+
+    with pytest.raises(JobConflictError):
+        submit_job({'ticker': 'AAPL'}, path=banco)
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from processos import process_pool_kwargs
+
+# Tickers treinados por padrão na atualização noturna (lista separada por vírgulas)
+WATCHLIST = [t for t in os.environ.get('TRAINING_WATCHLIST', 'AMBA').split(',') if t.strip()]
+
+def _train_ticker(ticker, params, batch_id):
+    """Treinar um ticker no processo do pool; falhas voltam como resultado, sem derrubar o lote"""
+    inicio = time.perf_counter()
+    try:
+        from criacao_modelo import train_model
+        resultado = train_model(ticker=ticker, plot_path=f'previsoes_completas_{ticker}.png',
+                                tags={'ticker': ticker, 'lote': batch_id}, **params)
+        return {'ticker': ticker, 'run_id': resultado['run_id'],
+                'metrics': {k: float(v) for k, v in resultado['metrics'].items()},
+                'duration': time.perf_counter() - inicio, 'error': None}
+    except Exception as e:
+        print(f"Erro ao treinar {ticker}: {e}")
+        return {'ticker': ticker, 'run_id': None, 'metrics': None,
+                'duration': time.perf_counter() - inicio, 'error': str(e)}
+
+def train_tickers(tickers, max_workers=None, threads_per_worker=None, summary_path=None, **params):
+    """Treinar um modelo por ticker em processos paralelos e retornar o resumo do lote"""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    batch_id = uuid.uuid4().hex[:12]
+
+    # Dividir os núcleos entre os processos
+    pool_kwargs = process_pool_kwargs(len(tickers), max_workers, threads_per_worker)
+    max_workers, (threads,) = pool_kwargs['max_workers'], pool_kwargs['initargs']
+    print(f"Lote {batch_id}: {len(tickers)} tickers, {max_workers} processos x {threads} threads")
+
+    inicio = time.perf_counter()
+
+    # Sincronizar os preços de todos os tickers em paralelo (limitado pelo cliente HTTP) antes dos treinos
+    from armazenamento_precos import price_store
+    price_store.sync_many(tickers, params.get('start_date') or '2019-01-01')
+
+    with ProcessPoolExecutor(**pool_kwargs) as executor:
+        futures = [executor.submit(_train_ticker, ticker, params, batch_id) for ticker in tickers]
+        resultados = [future.result() for future in futures]
+    wall_time = time.perf_counter() - inicio
+
+    duracao_total = sum(r['duration'] for r in resultados)
+    resumo = {
+        'batch_id': batch_id,
+        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'workers': max_workers,
+        'threads_per_worker': threads,
+        'params': params,
+        'wall_time': wall_time,
+        'sequential_time': duracao_total,
+        'speedup': duracao_total / wall_time if wall_time > 0 else None,
+        'succeeded': sum(r['error'] is None for r in resultados),
+        'failed': sum(r['error'] is not None for r in resultados),
+        'tickers': resultados
+    }
+
+    if summary_path:
+        with open(summary_path, 'w') as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+    return resumo
+
+def print_summary(resumo):
+    """Imprimir o resumo do lote em forma de tabela"""
+    print("\nResumo do Treinamento em Lote:")
+    print("\nTicker   | Duração (s) | Treino MAE | Teste MAE | Teste RMSE | run_id")
+    print("-" * 80)
+    for r in resumo['tickers']:
+        if r['error']:
+            print(f"{r['ticker']:8} | {r['duration']:11.1f} | ERRO: {r['error']}")
+            continue
+        m = r['metrics']
+        print(f"{r['ticker']:8} | {r['duration']:11.1f} | ${m['train_mae']:9.2f} | "
+              f"${m['test_mae']:8.2f} | ${m['test_rmse']:9.2f} | {r['run_id']}")
+    print(f"\nTempo total: {resumo['wall_time']:.1f}s "
+          f"(soma sequencial {resumo['sequential_time']:.1f}s, "
+          f"speedup {resumo['speedup'] or 0:.1f}x com {resumo['workers']} processos)")
+    print(f"Sucesso: {resumo['succeeded']}, falhas: {resumo['failed']}")
+
+def parse_args(argv=None):
+    """Argumentos da linha de comando do treinamento em lote"""
+    parser = argparse.ArgumentParser(description='Treinar um modelo por ticker em paralelo')
+    parser.add_argument('tickers', nargs='*', default=WATCHLIST)
+    parser.add_argument('--workers', dest='max_workers', type=int, default=None)
+    parser.add_argument('--threads', dest='threads_per_worker', type=int, default=None,
+                        help='Threads do TensorFlow por processo (padrão: núcleos / processos)')
+    parser.add_argument('--resumo', dest='summary_path', default='resumo_treinamento_lote.json')
+    parser.add_argument('--inicio', dest='start_date', default=None)
+    parser.add_argument('--fim', dest='end_date', default=None)
+    parser.add_argument('--janela', dest='window', type=int, default=None)
+    parser.add_argument('--horizonte', dest='horizon', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--epocas', dest='epochs', type=int, default=None)
+    parser.add_argument('--unidades', dest='units', type=int, default=None)
+    parser.add_argument('--unidades-densa', dest='dense_units', type=int, default=None)
+    parser.add_argument('--paciencia', dest='patience', type=int, default=None)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = vars(parse_args())
+    tickers = args.pop('tickers')
+    # Parâmetros não informados ficam com os padrões de criacao_modelo.train_model
+    params = {k: v for k, v in args.items() if v is not None}
+    resumo = train_tickers(tickers, **params)
+    print_summary(resumo)
+    sys.exit(1 if resumo['failed'] else 0)